@@ -0,0 +1,29 @@
+# src/_validator_aot.py
+"""
+Ahead-of-time build script for the EF validator's numeric kernel.
+
+Run once after installing numba:
+
+    python -m src._validator_aot
+
+This writes a compiled ``_validator_kernels`` extension next to this file.
+ef_validator imports it when present (no JIT warmup), otherwise it falls
+back to numba's @njit and finally to plain numpy.
+"""
+
+import os
+
+from numba.pycc import CC
+
+from .ef_validator import _check_linear_kinematics_loop
+
+cc = CC('_validator_kernels')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# adj_matrix is dtype=int (int64); masks are contiguous boolean arrays
+cc.export('check_linear_kinematics', 'i8(i8[::1], b1[::1], b1[::1])')(_check_linear_kinematics_loop)
+
+
+if __name__ == '__main__':
+    cc.compile()
+    print(f"Compiled validator kernel into {cc.output_dir}")
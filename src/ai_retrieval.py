@@ -1,11 +1,255 @@
 from typing import List, Tuple, Dict, Optional
 import os
+import sys
+import re
+import functools
 import json
+import hashlib
+from collections import OrderedDict
+import numpy as np
 from dotenv import load_dotenv
 load_dotenv()
 
+try:
+    import orjson as _json  # Optional: faster JSON parsing/serialization
+except ImportError:
+    import json as _json
+
 # Lazy import inside function to avoid hard dependency for non-AI paths
 
+GEMINI_MODEL_NAME = 'gemini-2.5-flash-lite'
+
+# Disk-backed response cache (set GEMINI_CACHE_DISABLE=1 to bypass)
+GEMINI_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'msmd', 'gemini')
+# Near-duplicate reuse is opt-in: set GEMINI_CACHE_SIMILARITY to a cosine threshold
+# (e.g. 0.99) to reuse a cached response for a query that is almost the same
+DEFAULT_CACHE_SIMILARITY = None
+_EMBEDDING_DIM = 1024
+# Embeddings of all cached queries, one row per entry (a single file, loaded on a miss)
+_CACHE_INDEX_NAME = 'index.npz'
+
+# Markdown code fences Gemini sometimes wraps around the JSON payload
+# (anchored to the ends so fences inside string values are left alone)
+_FENCE_RE = re.compile(r'\A\s*```(?:json)?\s*|\s*```\s*\Z', re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_gemini_model(model_name: str, api_key: str):
+    """Configure the Gemini SDK once and return a reusable GenerativeModel."""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name)
+
+
+def _embed_text(text: str) -> np.ndarray:
+    """
+    Cheap hashed embedding (unit length) used for near-duplicate lookups.
+
+    Word bigrams are hashed alongside the words, so texts with the same words in a
+    different order (e.g. "rotary to linear" vs "linear to rotary") do not collide.
+    """
+    vec = np.zeros(_EMBEDDING_DIM)
+    tokens = re.findall(r'[a-z0-9]+', text.lower())
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=4).digest()
+        vec[int.from_bytes(digest, 'little') % _EMBEDDING_DIM] += 1.0
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm > 0 else vec
+
+
+def _parse_rankings(response_text: str) -> List[Dict]:
+    """Strip optional markdown code fences and parse the Gemini ranking JSON."""
+    response_text = _FENCE_RE.sub('', response_text).strip()
+    return _json.loads(response_text.encode('utf-8'))
+
+
+def _compact_json(obj, sort_keys: bool = False) -> str:
+    """Serialize without indentation or separator spaces (orjson when available)."""
+    if _json is not json:
+        return _json.dumps(obj, option=_json.OPT_SORT_KEYS if sort_keys else 0).decode('utf-8')
+    return json.dumps(obj, sort_keys=sort_keys, separators=(',', ':'))
+
+
+def _read_cache_entry(path: str) -> Optional[Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _similarity_threshold() -> Optional[float]:
+    """Cosine threshold for near-duplicate reuse, or None when it is disabled (the default)."""
+    value = os.getenv('GEMINI_CACHE_SIMILARITY')
+    if value is None:
+        return DEFAULT_CACHE_SIMILARITY
+    try:
+        return float(value)
+    except ValueError:
+        return DEFAULT_CACHE_SIMILARITY
+
+
+def _read_cache_index() -> Optional[Dict[str, np.ndarray]]:
+    """Load the embedding index (keys, model, context, embedding arrays), or None if absent."""
+    try:
+        with np.load(os.path.join(GEMINI_CACHE_DIR, _CACHE_INDEX_NAME), allow_pickle=False) as data:
+            index = {name: data[name] for name in ('key', 'model', 'context', 'embedding')}
+    except (OSError, ValueError, KeyError):
+        return None
+    return index if index['embedding'].shape[1:] == (_EMBEDDING_DIM,) else None
+
+
+def _add_to_cache_index(key: str, model_name: str, context: str, embedding: np.ndarray) -> None:
+    """Append (or replace) one row of the embedding index, rewriting the file atomically."""
+    index = _read_cache_index()
+    if index is None:
+        index = {
+            'key': np.empty(0, dtype=str),
+            'model': np.empty(0, dtype=str),
+            'context': np.empty(0, dtype=str),
+            'embedding': np.empty((0, _EMBEDDING_DIM)),
+        }
+    keep = index['key'] != key
+    index = {
+        'key': np.append(index['key'][keep], key),
+        'model': np.append(index['model'][keep], model_name),
+        'context': np.append(index['context'][keep], context),
+        'embedding': np.vstack([index['embedding'][keep], embedding]),
+    }
+    path = os.path.join(GEMINI_CACHE_DIR, _CACHE_INDEX_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **index)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Failed to update Gemini cache index: {e}")
+
+
+def _find_similar_cache_entry(model_name: str, context: str, embedding: np.ndarray) -> Optional[Dict]:
+    """Return the most similar cached entry for the same model/context above the threshold."""
+    threshold = _similarity_threshold()
+    if threshold is None or threshold > 1.0 or not embedding.any():
+        return None
+
+    index = _read_cache_index()
+    if index is None:
+        return None
+    rows = np.flatnonzero((index['model'] == model_name) & (index['context'] == context))
+    if rows.size == 0:
+        return None
+
+    similarities = index['embedding'][rows] @ embedding
+    best = int(np.argmax(similarities))
+    if similarities[best] < threshold:
+        return None
+    return _read_cache_entry(os.path.join(GEMINI_CACHE_DIR, f"{index['key'][rows[best]]}.json"))
+
+
+def _write_cache_entry(path: str, entry: Dict) -> None:
+    """Atomically write a cache entry (write to a temp file, then os.replace)."""
+    try:
+        os.makedirs(GEMINI_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(_compact_json(entry))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Failed to write Gemini cache entry: {e}")
+
+
+def _cache_lookup(prompt: str, model_name: str, semantic_text: str, context: str) -> Tuple[Optional[str], str, np.ndarray]:
+    """Return (cached_response_or_None, cache_key, query_embedding) for a prompt."""
+    key = hashlib.sha256(f"{model_name}\0{prompt}".encode('utf-8')).hexdigest()
+    embedding = _embed_text(semantic_text)
+    entry = _read_cache_entry(os.path.join(GEMINI_CACHE_DIR, f"{key}.json"))
+    if entry is not None:
+        print(" -> Using cached Gemini response")
+        return entry['response'], key, embedding
+
+    entry = _find_similar_cache_entry(model_name, context, embedding)
+    if entry is not None:
+        print(" -> Using cached Gemini response for a near-identical query")
+        return entry['response'], key, embedding
+    return None, key, embedding
+
+
+def _cache_store(key: str, model_name: str, context: str, embedding: np.ndarray, response_text: str) -> None:
+    """Persist a fresh response (and its index row), but only if it parses as rankings."""
+    try:
+        _parse_rankings(response_text)
+    except ValueError:
+        return
+    _write_cache_entry(os.path.join(GEMINI_CACHE_DIR, f"{key}.json"), {
+        'model': model_name,
+        'context': context,
+        'response': response_text,
+    })
+    if embedding.any():
+        _add_to_cache_index(key, model_name, context, embedding)
+
+
+def _gemini_cached_generate(model, prompt: str, model_name: str, semantic_text: str = '', context: str = '') -> str:
+    """
+    Return the Gemini response text for a prompt, consulting the on-disk cache first.
+
+    Exact hits are keyed on sha256(model_name + "\0" + prompt). On a miss, and only
+    when GEMINI_CACHE_SIMILARITY is set, cached responses for the same model and
+    context (e.g. the building-blocks summary) are reused when the embedding of
+    semantic_text (the query without any fixed prompt wording) is near-identical.
+    Only responses that parse as rankings are persisted.
+    """
+    if os.getenv('GEMINI_CACHE_DISABLE') == '1':
+        return model.generate_content(prompt).text
+
+    cached, key, embedding = _cache_lookup(prompt, model_name, semantic_text, context)
+    if cached is not None:
+        return cached
+    response_text = model.generate_content(prompt).text
+    _cache_store(key, model_name, context, embedding, response_text)
+    return response_text
+
+
+async def _gemini_cached_generate_async(model, prompt: str, model_name: str, semantic_text: str = '', context: str = '') -> str:
+    """Async variant of _gemini_cached_generate (uses generate_content_async)."""
+    if os.getenv('GEMINI_CACHE_DISABLE') == '1':
+        return (await model.generate_content_async(prompt)).text
+
+    cached, key, embedding = _cache_lookup(prompt, model_name, semantic_text, context)
+    if cached is not None:
+        return cached
+    response_text = (await model.generate_content_async(prompt)).text
+    _cache_store(key, model_name, context, embedding, response_text)
+    return response_text
+
+
+def _fallback_ranking(building_blocks: List[Dict], score: float = 0.5) -> List[Tuple[str, float]]:
+    """Return all mechanisms with an equal score (used when Gemini cannot rank)."""
+    return [(block.get("name", f"mechanism_{i}"), score) for i, block in enumerate(building_blocks)]
+
+
+_TABLE_COLUMNS = ("name", "description", "text_description", "motion_conversion", "num_elements")
+
+
+def _table_cell(value) -> str:
+    """Render a value as a single table cell (no pipes or line breaks)."""
+    return str(value).replace("|", "/").replace("\r", " ").replace("\n", " ")
+
+
+def _mechanisms_table(building_blocks: List[Dict]) -> str:
+    """Summarize building blocks as a pipe-delimited table for the Gemini prompt."""
+    lines = ["|".join(_TABLE_COLUMNS)]
+    for block in building_blocks:
+        lines.append("|".join((
+            _table_cell(block.get("name", "Unknown")),
+            _table_cell(block.get("description", "")),
+            _table_cell(block.get("text_description", "")),
+            _table_cell(block.get("motion_conversion", "")),
+            _table_cell(block.get("num_elements", 0)),
+        )))
+    return "\n".join(lines)
+
 
 def rank_mechanisms_by_similarity(query_description: str, building_blocks: List[Dict]) -> List[Tuple[str, float]]:
     """
@@ -19,43 +263,56 @@ def rank_mechanisms_by_similarity(query_description: str, building_blocks: List[
     Returns:
         List of tuples (mechanism_name, similarity_score) sorted by score desc.
     """
+    # Nothing to rank: skip the Gemini round-trip entirely
+    if len(building_blocks) <= 1:
+        return _fallback_ranking(building_blocks, score=1.0)
+    if not query_description or not query_description.strip():
+        return _fallback_ranking(building_blocks)
+
+    ranked = _rank_with_gemini(query_description, building_blocks)
+    return ranked if ranked is not None else _fallback_ranking(building_blocks)
+
+
+async def rank_mechanisms_by_similarity_async(query_description: str, building_blocks: List[Dict]) -> List[Tuple[str, float]]:
+    """Async variant of rank_mechanisms_by_similarity; awaits the Gemini request."""
+    if len(building_blocks) <= 1:
+        return _fallback_ranking(building_blocks, score=1.0)
+    if not query_description or not query_description.strip():
+        return _fallback_ranking(building_blocks)
+
+    ranked = await _rank_with_gemini_async(query_description, building_blocks)
+    return ranked if ranked is not None else _fallback_ranking(building_blocks)
+
+
+def _prepare_gemini_request(query_description: str, building_blocks: List[Dict]):
+    """Return (model, prompt, context) for a ranking request, or None when Gemini is unavailable."""
     try:
         import google.generativeai as genai
     except ImportError:
         print("Warning: google-generativeai not installed. Falling back to simple ranking.")
-        # Fallback: return all mechanisms with equal score
-        return [(block.get("name", f"mechanism_{i}"), 0.5) for i, block in enumerate(building_blocks)]
+        return None
 
     # Get API key from environment or prompt user
     try:
         from .config import get_gemini_api_key
-        api_key = get_gemini_api_key()
+        # Only prompt for a key when someone is at the terminal
+        api_key = get_gemini_api_key(interactive=sys.stdin is not None and sys.stdin.isatty())
     except ImportError:
         api_key = os.getenv('GEMINI_API_KEY')
     
     if not api_key:
         print("⚠ Gemini API key not available. Using fallback ranking.")
-        # Fallback: return all mechanisms with equal score
-        return [(block.get("name", f"mechanism_{i}"), 0.5) for i, block in enumerate(building_blocks)]
+        return None
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.5-flash-lite')
+        model = _get_gemini_model(GEMINI_MODEL_NAME, api_key)
     except Exception as e:
         print(f"Warning: Failed to configure Gemini AI: {e}")
         print("Falling back to simple ranking.")
-        return [(block.get("name", f"mechanism_{i}"), 0.5) for i, block in enumerate(building_blocks)]
+        return None
 
-    # Prepare building blocks summary for prompt
-    mechanisms_summary = []
-    for block in building_blocks:
-        mechanisms_summary.append({
-            "name": block.get("name", "Unknown"),
-            "description": block.get("description", ""),
-            "text_description": block.get("text_description", ""),
-            "motion_conversion": block.get("motion_conversion", ""),
-            "num_elements": block.get("num_elements", 0)
-        })
+    # Prepare building blocks summary for prompt (compact pipe-delimited table)
+    mechanisms_table = _mechanisms_table(building_blocks)
 
     # Create prompt for Gemini
     prompt = f"""You are a mechanical design expert. Given a design task description, rank the available building block mechanisms by how well they match the requirements.
@@ -63,8 +320,8 @@ def rank_mechanisms_by_similarity(query_description: str, building_blocks: List[
 TASK DESCRIPTION:
 {query_description}
 
-AVAILABLE MECHANISMS:
-{json.dumps(mechanisms_summary, indent=2)}
+AVAILABLE MECHANISMS (pipe-delimited table, first line is the header):
+{mechanisms_table}
 
 INSTRUCTIONS:
 1. Analyze how well each mechanism matches the task requirements
@@ -81,51 +338,125 @@ Return ONLY valid JSON in this exact format:
 
 Do not include any text before or after the JSON array."""
 
-    try:
-        response = model.generate_content(prompt)
-        response_text = response.text.strip()
-        
-        # Clean response - remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-
-        # Parse JSON response
-        rankings = json.loads(response_text)
-        
-        # Convert to list of tuples and ensure all mechanisms are included
-        ranked_dict = {item["name"]: item["score"] for item in rankings}
-        
-        # Create full ranking list (include mechanisms not in Gemini response with lower scores)
-        ranked: List[Tuple[str, float]] = []
-        for block in building_blocks:
-            name = block.get("name", "Unknown")
-            score = ranked_dict.get(name, 0.1)  # Default low score if not ranked
-            ranked.append((name, float(score)))
-        
-        # Sort by score descending
-        ranked.sort(key=lambda x: x[1], reverse=True)
-        
-        # Print top 3 with reasoning
-        print("\n[Gemini AI Ranking Results]")
-        for i, item in enumerate(rankings[:3], 1):
-            print(f"  {i}. {item['name']}: {item['score']:.2f} - {item.get('reasoning', 'N/A')}")
-        
-        return ranked
+    context = hashlib.sha256(mechanisms_table.encode('utf-8')).hexdigest()
+    return model, prompt, context
 
-    except json.JSONDecodeError as e:
-        print(f"Warning: Failed to parse Gemini response as JSON: {e}")
+
+def _rankings_from_response(response_text: str, building_blocks: List[Dict]) -> List[Tuple[str, float]]:
+    """Turn a Gemini response into a full, score-sorted ranking of building_blocks."""
+    # Parse JSON response (markdown code fences are stripped if present)
+    rankings = _parse_rankings(response_text)
+    
+    # Convert to list of tuples and ensure all mechanisms are included
+    ranked_dict = {item["name"]: item["score"] for item in rankings}
+    
+    # Create full ranking list (include mechanisms not in Gemini response with lower scores)
+    ranked: List[Tuple[str, float]] = []
+    for block in building_blocks:
+        name = block.get("name", "Unknown")
+        score = ranked_dict.get(name, 0.1)  # Default low score if not ranked
+        ranked.append((name, float(score)))
+    
+    # Sort by score descending
+    ranked.sort(key=lambda x: x[1], reverse=True)
+    
+    # Print top 3 with reasoning
+    print("\n[Gemini AI Ranking Results]")
+    for i, item in enumerate(rankings[:3], 1):
+        print(f"  {i}. {item['name']}: {item['score']:.2f} - {item.get('reasoning', 'N/A')}")
+    
+    return ranked
+
+
+def _ranking_failed(error: Exception, response_text: str) -> None:
+    """Report a failed Gemini ranking; callers fall back to the simple ranking."""
+    if isinstance(error, json.JSONDecodeError):
+        print(f"Warning: Failed to parse Gemini response as JSON: {error}")
         print(f"Response was: {response_text[:200]}...")
-        # Fallback: return all with equal score
-        return [(block.get("name", f"mechanism_{i}"), 0.5) for i, block in enumerate(building_blocks)]
+    else:
+        print(f"Warning: Error calling Gemini AI: {error}")
+    return None
+
+
+def _rank_with_gemini(query_description: str, building_blocks: List[Dict], semantic_text: Optional[str] = None) -> Optional[List[Tuple[str, float]]]:
+    """
+    Query Gemini for a ranking; returns None when Gemini is unavailable or fails.
+
+    semantic_text is what the cache embeds for near-duplicate lookups (defaults to
+    query_description).
+    """
+    request = _prepare_gemini_request(query_description, building_blocks)
+    if request is None:
+        return None
+    model, prompt, context = request
+
+    response_text = ''
+    try:
+        response_text = _gemini_cached_generate(
+            model, prompt, GEMINI_MODEL_NAME, query_description if semantic_text is None else semantic_text, context
+        )
+        return _rankings_from_response(response_text, building_blocks)
+    except Exception as e:
+        return _ranking_failed(e, response_text)
+
+
+async def _rank_with_gemini_async(query_description: str, building_blocks: List[Dict], semantic_text: Optional[str] = None) -> Optional[List[Tuple[str, float]]]:
+    """Async variant of _rank_with_gemini."""
+    request = _prepare_gemini_request(query_description, building_blocks)
+    if request is None:
+        return None
+    model, prompt, context = request
+
+    response_text = ''
+    try:
+        response_text = await _gemini_cached_generate_async(
+            model, prompt, GEMINI_MODEL_NAME, query_description if semantic_text is None else semantic_text, context
+        )
+        return _rankings_from_response(response_text, building_blocks)
     except Exception as e:
-        print(f"Warning: Error calling Gemini AI: {e}")
-        # Fallback: return all with equal score
-        return [(block.get("name", f"mechanism_{i}"), 0.5) for i, block in enumerate(building_blocks)]
+        return _ranking_failed(e, response_text)
+
+
+# Rankings for identical (query, building blocks) inputs, shared by the sync and
+# async entry points; the disk cache covers cross-process reuse.
+_RANKING_MEMO: "OrderedDict[Tuple[str, str], Tuple[Tuple[str, float], ...]]" = OrderedDict()
+_RANKING_MEMO_SIZE = 256
+
+
+def _memo_get(key: Tuple[str, str]) -> Optional[Tuple[Tuple[str, float], ...]]:
+    ranked = _RANKING_MEMO.get(key)
+    if ranked is not None:
+        _RANKING_MEMO.move_to_end(key)
+    return ranked
+
+
+def _memo_put(key: Tuple[str, str], ranked: List[Tuple[str, float]]) -> None:
+    _RANKING_MEMO[key] = tuple(ranked)
+    _RANKING_MEMO.move_to_end(key)
+    while len(_RANKING_MEMO) > _RANKING_MEMO_SIZE:
+        _RANKING_MEMO.popitem(last=False)
+
+
+def _gemini_task_query(task_description: str, elemental_functions: List[Dict]) -> str:
+    """Build the full-context ranking query (task plus every EF)."""
+    ef_summary = "\n".join([
+        f"- {ef.get('ef_id', 'EF')}: {ef.get('type', '')} - {ef.get('description', '')}"
+        for ef in elemental_functions
+    ])
+    
+    return f"""TASK: {task_description}
+
+ELEMENTAL FUNCTIONS REQUIRED:
+{ef_summary}
+
+Please rank mechanisms that can serve as a good starting point to satisfy these requirements."""
+
+
+def _task_semantic_text(task_description: str, elemental_functions: List[Dict]) -> str:
+    """The task-specific text of _gemini_task_query (no template wording), for cache embeddings."""
+    return "\n".join([task_description] + [
+        f"{ef.get('type', '')} {ef.get('description', '')}" for ef in elemental_functions
+    ])
 
 
 def rank_mechanisms_by_gemini(
@@ -144,19 +475,40 @@ def rank_mechanisms_by_gemini(
     Returns:
         List of tuples (mechanism_name, similarity_score) sorted by score desc.
     """
-    # Build comprehensive query including all EFs
-    ef_summary = "\n".join([
-        f"- {ef.get('ef_id', 'EF')}: {ef.get('type', '')} - {ef.get('description', '')}"
-        for ef in elemental_functions
-    ])
-    
-    full_query = f"""TASK: {task_description}
+    if len(building_blocks) <= 1:
+        return _fallback_ranking(building_blocks, score=1.0)
 
-ELEMENTAL FUNCTIONS REQUIRED:
-{ef_summary}
+    full_query = _gemini_task_query(task_description, elemental_functions)
+    key = (full_query, _compact_json(building_blocks, sort_keys=True))
+    ranked = _memo_get(key)
+    if ranked is None:
+        ranked = _rank_with_gemini(full_query, building_blocks, _task_semantic_text(task_description, elemental_functions))
+        if ranked is None:
+            return _fallback_ranking(building_blocks)
+        _memo_put(key, ranked)
+    return list(ranked)
 
-Please rank mechanisms that can serve as a good starting point to satisfy these requirements."""
-    
-    return rank_mechanisms_by_similarity(full_query, building_blocks)
 
+async def rank_mechanisms_by_gemini_async(
+    task_description: str,
+    elemental_functions: List[Dict],
+    building_blocks: List[Dict]
+) -> List[Tuple[str, float]]:
+    """
+    Async variant of rank_mechanisms_by_gemini.
+
+    Successful rankings land in the same in-process memo, so awaiting this ahead
+    of time makes a later synchronous call for the same inputs return instantly.
+    """
+    if len(building_blocks) <= 1:
+        return _fallback_ranking(building_blocks, score=1.0)
 
+    full_query = _gemini_task_query(task_description, elemental_functions)
+    key = (full_query, _compact_json(building_blocks, sort_keys=True))
+    ranked = _memo_get(key)
+    if ranked is None:
+        ranked = await _rank_with_gemini_async(full_query, building_blocks, _task_semantic_text(task_description, elemental_functions))
+        if ranked is None:
+            return _fallback_ranking(building_blocks)
+        _memo_put(key, ranked)
+    return list(ranked)
@@ -1,16 +1,14 @@
 import os
 import json
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional, List, Tuple
 
 from .initial_solution import find_initial_solutions
 from .synthesis_engine import run_synthesis, SearchNode
+from .task_files import list_task_files
 from .visualizer import Visualizer
 
 
-def _list_task_files(tasks_dir: str) -> List[str]:
-    return [f for f in os.listdir(tasks_dir) if f.endswith('.json')]
-
-
 def select_task(tasks_dir: str = 'tasks') -> Optional[str]:
     """Lets the user select a design task from the tasks directory."""
     print("\n--- Task Selection ---")
@@ -19,7 +17,7 @@ def select_task(tasks_dir: str = 'tasks') -> Optional[str]:
         print(f"Tasks directory not found: {tasks_dir}")
         return None
 
-    task_files = _list_task_files(tasks_dir)
+    task_files = list_task_files(tasks_dir)
     if not task_files:
         print("No task files found in the 'tasks/' directory.")
         return None
@@ -62,6 +60,12 @@ def _select_retrieval_method() -> str:
     return 'ai'
 
 
+def _run_one(task: dict, initial_sol: dict, i: int) -> Tuple[str, Optional[SearchNode]]:
+    """Worker entry point: run synthesis for one initial solution."""
+    print(f"\n--- Exploring Initial Solution #{i+1}: {initial_sol['name']} ---", flush=True)
+    return initial_sol['name'], run_synthesis(task, initial_sol, enable_visualization=True)
+
+
 def main_cli() -> None:
     """Main function to run the interactive command-line interface."""
     print("======================================================")
@@ -92,16 +96,20 @@ def main_cli() -> None:
     _ensure_output_dir('output')
     visualizer = Visualizer()
 
-    for i, initial_sol in enumerate(initial_solutions):
-        print(f"\n--- Exploring Initial Solution #{i+1}: {initial_sol['name']} ---")
-        final_node = run_synthesis(task, initial_sol, enable_visualization=True)
+    # Each initial solution is an independent, CPU-bound search; separate processes
+    # let them run in parallel despite the GIL. Results keep input order.
+    with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(initial_solutions))) as executor:
+        futures = [executor.submit(_run_one, task, sol, i) for i, sol in enumerate(initial_solutions)]
+        results = [future.result() for future in futures]
+
+    for name, final_node in results:
         if final_node:
-            final_solutions.append((initial_sol['name'], final_node))
+            final_solutions.append((name, final_node))
             
             # Print step-by-step visualization location
             if hasattr(final_node, 'path') and final_node.path:
                 task_name = task.get('task_name', 'Unknown_Task').replace(" ", "_")
-                mechanism_name = initial_sol['name'].replace(" ", "_")
+                mechanism_name = name.replace(" ", "_")
                 steps_dir = f"output/synthesis_steps/{task_name}/{mechanism_name}"
                 print(f"  -> Step-by-step visualizations saved to: {steps_dir}/")
 
@@ -113,6 +121,7 @@ def main_cli() -> None:
         print("No valid final mechanisms were synthesized.")
     else:
         print(f"Successfully synthesized {len(final_solutions)} valid mechanism(s).")
+        animation_jobs = []
         for i, (name, solution_node) in enumerate(final_solutions):
             print(f"\n--- Final Solution #{i+1} (from '{name}') ---")
             if hasattr(solution_node, 'path') and solution_node.path:
@@ -124,11 +133,14 @@ def main_cli() -> None:
             visualizer.draw_schematic(name, solution_node, output_filename)
             print(f"  -> Schematic saved to 'output/{output_filename}'")
 
-            # Generate Animation
+            # Queue Animation (rendered below, one worker process per animation)
             gif_filename = f"solution_{i+1}_{name.replace(' ', '_')}.gif"
             print(f"  -> Generating animation for '{name}'...")
-            visualizer.generate_animation(name, gif_filename, solution_node=solution_node)
+            animation_jobs.append((name, gif_filename, solution_node, {}))
+
+        Visualizer.generate_animations(animation_jobs)
 
+    visualizer.close()
     print("\nExiting CoDe-SyMM 2.0.")
 
 
@@ -10,15 +10,36 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-def get_gemini_api_key() -> Optional[str]:
+# Resolved API key (or None once the user skipped / no key exists); _UNSET until first lookup
+_UNSET = object()
+_API_KEY_CACHE = _UNSET
+
+
+def get_gemini_api_key(interactive: bool = True) -> Optional[str]:
     """
     Get Gemini API key from environment variable or prompt user.
+    The lookup (and any interactive prompt) happens once per process.
+    
+    Args:
+        interactive: Prompt on stdin when the environment variable is missing.
+            Pass False from automated runs (benchmarks, CI) to never block.
     
     Returns:
         API key string or None if not available
     """
+    global _API_KEY_CACHE
+    if _API_KEY_CACHE is _UNSET:
+        _API_KEY_CACHE = _lookup_gemini_api_key(interactive)
+    return _API_KEY_CACHE
+
+
+def _lookup_gemini_api_key(interactive: bool) -> Optional[str]:
+    """Read GEMINI_API_KEY, optionally falling back to an interactive prompt."""
     api_key = os.getenv('GEMINI_API_KEY')
     
+    if not api_key and not interactive:
+        return None
+
     if not api_key:
         print("\n" + "="*60)
         print("Gemini API Key Required")
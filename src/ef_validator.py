@@ -4,14 +4,178 @@ EF (Elemental Function) Validation Module
 Validates whether a mechanism graph can satisfy a given elemental function.
 """
 
-from typing import Dict, Tuple, List, Set
+import functools
+import json
+import numpy as np
+from typing import Dict, Tuple, List, Set, Iterable, Optional
 from .mechanism_graph import MechanismGraph
 
+try:
+    from numba import njit  # Optional: JIT for the numeric validation kernels
+except ImportError:
+    njit = None
+
+# Graphs up to this size use a Python bitmask scan instead of np.isin (lower dispatch cost)
+_SMALL_GRAPH_MAX_ELEMENTS = 8
+
+
+def _code_mask(codes: Iterable[int]) -> int:
+    """Build a bitmask with one bit per joint code (-1 maps to bit 63)."""
+    mask = 0
+    for code in codes:
+        mask |= 1 << (code & 63)
+    return mask
+
+
+# Type-2 (stopper): 5 (LP), 7 (LSP) or -1 (F); Type-3 (spring): 6 (SP) or 7 (LSP)
+_TYPE2_SET = np.array([5, 7, -1], dtype=np.int64)
+_TYPE3_SET = np.array([6, 7], dtype=np.int64)
+_TYPE2_MASK = _code_mask(_TYPE2_SET.tolist())
+_TYPE3_MASK = _code_mask(_TYPE3_SET.tolist())
+
+
+@functools.lru_cache(maxsize=32)
+def _triu_idx(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Upper-triangle (k=1) indices for an n x n matrix, cached per size."""
+    return np.triu_indices(n, k=1)
+
+
+def _has_joint_code(graph: MechanismGraph, code_set: np.ndarray, code_mask: int) -> bool:
+    """Check whether any joint in the graph uses one of the given codes."""
+    upper_tri = graph.adj_matrix[_triu_idx(graph.num_elements)]
+    if graph.num_elements <= _SMALL_GRAPH_MAX_ELEMENTS:
+        return any((code_mask >> (code & 63)) & 1 for code in upper_tri.tolist())
+    return bool(np.isin(upper_tri, code_set).any())
+
+
+# Joint-to-ground codes that provide linear motion: P, LP, SP, LSP
+_LINEAR_JOINT_CODES = np.array([3, 5, 6, 7])
+
+
+def _check_linear_kinematics_loop(adj_row0: np.ndarray, linear_mask: np.ndarray, motion_nonzero: np.ndarray) -> int:
+    """Return the first moving linear element without a prismatic-type joint to ground, or -1."""
+    for i in range(adj_row0.shape[0]):
+        if linear_mask[i] and motion_nonzero[i]:
+            code = adj_row0[i]
+            if code != 3 and code != 5 and code != 6 and code != 7:
+                return i
+    return -1
+
+
+def _check_linear_kinematics_numpy(adj_row0: np.ndarray, linear_mask: np.ndarray, motion_nonzero: np.ndarray) -> int:
+    """Vectorized fallback for _check_linear_kinematics when numba is not installed."""
+    bad = np.flatnonzero(linear_mask & motion_nonzero & ~np.isin(adj_row0, _LINEAR_JOINT_CODES))
+    return int(bad[0]) if bad.size else -1
+
+
+# Prefer the AOT-compiled kernel (built by src/_validator_aot.py), then numba's
+# JIT, then numpy
+try:
+    from ._validator_kernels import check_linear_kinematics as _check_linear_kinematics
+except ImportError:
+    if njit is not None:
+        _check_linear_kinematics = njit(cache=True)(_check_linear_kinematics_loop)
+    else:
+        _check_linear_kinematics = _check_linear_kinematics_numpy
+
+
+def _element_index(elem_id: str) -> Optional[int]:
+    """Convert an element ID like 'E2' to its graph index (2), or None if malformed."""
+    try:
+        return int(elem_id[1:])
+    except (TypeError, ValueError):
+        return None
+
+
+# Element names implying linear motion (need a prismatic-type joint to ground when moving)
+_LINEAR_KEYWORDS = ('bolt', 'rack', 'slider', 'piston', 'ram', 'plunger')
+
+
+def _ef_key(ef: Dict) -> str:
+    """Canonical JSON of an EF (the validation cache key)."""
+    return json.dumps(ef, sort_keys=True, default=str)
+
+
+def validator_metadata(task: Dict) -> Dict:
+    """
+    Snapshot of the per-task lookups used by every validation call for a task.
+
+    Build it once per synthesis run and pass it as ``meta`` to the validation
+    functions; it is not stored on the task, so rebuild it if the task changes.
+    """
+    ef_by_id = {ef['ef_id']: ef for ef in task.get('elemental_functions', [])}
+    return {
+        'elements_key': json.dumps(task.get('elements', {}), sort_keys=True),
+        'ef_by_id': ef_by_id,
+        'ef_ids': frozenset(ef_by_id),
+        'ef_keys': {ef_id: _ef_key(ef) for ef_id, ef in ef_by_id.items()},
+    }
+
+
+def _ef_cache_key(ef: Dict, meta: Dict) -> str:
+    """Canonical JSON of an EF, precomputed in the metadata for the task's own EF objects."""
+    ef_id = ef.get('ef_id')
+    if meta['ef_by_id'].get(ef_id) is ef:
+        return meta['ef_keys'][ef_id]
+    return _ef_key(ef)
+
+
+@functools.lru_cache(maxsize=64)
+def _elements_metadata(elements_key: str) -> Dict:
+    """Element index map and linear-element lookups for a task's element table."""
+    elements = json.loads(elements_key)
+    # Map element IDs to indices (E1 -> 1, E2 -> 2, etc.)
+    element_to_idx = {}
+    for elem_id in elements:
+        idx = _element_index(elem_id)
+        if idx is not None:
+            element_to_idx[elem_id] = idx
+    linear_element_ids = tuple(
+        elem_id for elem_id, elem_name in elements.items()
+        if any(k in elem_name.lower() for k in _LINEAR_KEYWORDS)
+    )
+    return {
+        'elements': elements,
+        'element_to_idx': element_to_idx,
+        'available_elements': frozenset(element_to_idx),
+        'linear_element_ids': linear_element_ids,
+        'linear_masks': {},
+    }
+
+
+def _linear_mask(elem_meta: Dict, n: int) -> Tuple[np.ndarray, Dict[int, str]]:
+    """Boolean mask of linear elements for an n-element graph (cached per n)."""
+    cached = elem_meta['linear_masks'].get(n)
+    if cached is None:
+        linear_mask = np.zeros(n, dtype=np.bool_)
+        linear_id_by_idx = {}
+        for elem_id in elem_meta['linear_element_ids']:
+            idx = elem_meta['element_to_idx'].get(elem_id)
+            if idx is not None and 0 <= idx < n:
+                linear_mask[idx] = True
+                linear_id_by_idx[idx] = elem_id
+        cached = elem_meta['linear_masks'][n] = (linear_mask, linear_id_by_idx)
+    return cached
+
+
+@functools.lru_cache(maxsize=4096)
+def _validate_core(adj_bytes: bytes, n: int, ef_key: str, elements_key: str) -> Tuple[bool, str]:
+    """
+    Memoized validation keyed on the adjacency matrix contents.
+
+    The key is the matrix bytes themselves, so mutating a graph simply yields
+    a different key and no explicit invalidation is needed.
+    """
+    graph = MechanismGraph(n)
+    graph.adj_matrix = np.frombuffer(adj_bytes, dtype=np.int64).reshape(n, n).copy()
+    return _validate_uncached(graph, json.loads(ef_key), _elements_metadata(elements_key))
+
 
 def validate_ef_satisfaction(
     graph: MechanismGraph,
     ef: Dict,
-    task: Dict
+    task: Dict,
+    meta: Optional[Dict] = None
 ) -> Tuple[bool, str]:
     """
     Validate if a mechanism graph can satisfy a given elemental function.
@@ -20,10 +184,19 @@ def validate_ef_satisfaction(
         graph: The mechanism graph to validate
         ef: Elemental function dictionary with behavior specification
         task: Full task dictionary (for element mapping)
+        meta: Optional validator_metadata(task) (build once per synthesis run)
         
     Returns:
         Tuple of (is_valid, reason_string)
     """
+    if meta is None:
+        meta = validator_metadata(task)
+    adj_bytes = np.ascontiguousarray(graph.adj_matrix, dtype=np.int64).tobytes()
+    return _validate_core(adj_bytes, graph.num_elements, _ef_cache_key(ef, meta), meta['elements_key'])
+
+
+def _validate_uncached(graph: MechanismGraph, ef: Dict, elem_meta: Dict) -> Tuple[bool, str]:
+    """Full validation of one EF against a graph (see validate_ef_satisfaction)."""
     # Basic checks
     if not graph.is_connected():
         return False, "Graph is not connected"
@@ -36,21 +209,11 @@ def validate_ef_satisfaction(
     
     # Check if graph has required elements
     ef_behavior = ef.get('behavior', [])
-    task_elements = task.get('elements', {})
-    
-    # Map element IDs to indices (E1 -> 1, E2 -> 2, etc.)
-    element_to_idx = {}
-    for elem_id, elem_name in task_elements.items():
-        # Extract number from E1, E2, etc.
-        try:
-            idx = int(elem_id[1:])  # Remove 'E' prefix
-            element_to_idx[elem_id] = idx
-        except:
-            continue
+    task_elements = elem_meta['elements']
     
     # Check if all elements in EF behavior are present in graph
     required_elements = {beh.get('element') for beh in ef_behavior if 'element' in beh}
-    available_elements = set(element_to_idx.keys())
+    available_elements = elem_meta['available_elements']
     
     if not required_elements.issubset(available_elements):
         missing = required_elements - available_elements
@@ -59,32 +222,20 @@ def validate_ef_satisfaction(
     # Check Kinematic Type Compatibility (e.g. Linear Motion requirements)
     # Strategy: Identify elements that imply linear motion based on their name in the task definition
     # and ensure they have a Prismatic Joint to Ground if they are moving.
-    task_elements = task.get('elements', {})
-    linear_keywords = ['bolt', 'rack', 'slider', 'piston', 'ram', 'plunger']
-    
-    linear_element_ids = []
-    for elem_id, elem_name in task_elements.items():
-        if any(k in elem_name.lower() for k in linear_keywords):
-            linear_element_ids.append(elem_id)
-            
-    ef_behavior = ef.get('behavior', [])
+    n = graph.num_elements
+    linear_mask, linear_id_by_idx = _linear_mask(elem_meta, n)
+    motion_nonzero = np.zeros(n, dtype=np.bool_)
     for beh in ef_behavior:
-        elem_id = beh.get('element')
-        motion = beh.get('motion', '0')
-        
-        # If a known linear element is moving, verify its kinematic constraint
-        if elem_id in linear_element_ids and motion != '0':
-            try:
-                # Convert E2 -> index 2
-                elem_idx = int(elem_id[1:])
-                # Check connection to Ground (Index 0)
-                joint_to_ground = graph.adj_matrix[0, elem_idx]
-                
-                # UPDATE: Allow 3, 5, 6, and 7 (LSP)
-                if joint_to_ground not in [3, 5, 6, 7]:
-                     return False, f"Kinematic Mismatch: Element '{elem_id}' ({task_elements.get(elem_id)}) requires Linear Motion (Prismatic Joint to Ground), but found code {joint_to_ground}."
-            except (ValueError, IndexError):
-                pass
+        if beh.get('motion', '0') != '0':
+            idx = _element_index(beh.get('element'))
+            if idx is not None and 0 <= idx < n:
+                motion_nonzero[idx] = True
+
+    bad_idx = _check_linear_kinematics(np.ascontiguousarray(graph.adj_matrix[0], dtype=np.int64), linear_mask, motion_nonzero)
+    if bad_idx >= 0:
+        elem_id = linear_id_by_idx[bad_idx]
+        joint_to_ground = graph.adj_matrix[0, bad_idx]
+        return False, f"Kinematic Mismatch: Element '{elem_id}' ({task_elements.get(elem_id)}) requires Linear Motion (Prismatic Joint to Ground), but found code {joint_to_ground}."
 
     # Validate behavior patterns based on EF type
     ef_type = ef.get('type', '')
@@ -112,18 +263,14 @@ def validate_ef_satisfaction(
     elif ef_type == 'Type-2':
         # Type-2: Constraint/stopper
         # UPDATE: Allow 5 (LP), 7 (LSP), or -1 (F)
-        import numpy as np
-        upper_tri = graph.adj_matrix[np.triu_indices(graph.num_elements, k=1)]
-        if any(x in upper_tri for x in [5, 7, -1]):
+        if _has_joint_code(graph, _TYPE2_SET, _TYPE2_MASK):
             return True, "Type-2 constraint satisfied"
         return False, "Type-2 requires Stopper"
     
     elif ef_type == 'Type-3':
         # Type-3: Return spring
         # UPDATE: Allow 6 (SP) or 7 (LSP)
-        import numpy as np
-        upper_tri = graph.adj_matrix[np.triu_indices(graph.num_elements, k=1)]
-        if any(x in upper_tri for x in [6, 7]):
+        if _has_joint_code(graph, _TYPE3_SET, _TYPE3_MASK):
             return True, "Type-3 constraint satisfied"
         return False, "Type-3 requires Spring"
     
@@ -135,7 +282,9 @@ def validate_ef_satisfaction(
 def check_all_efs_satisfied(
     graph: MechanismGraph,
     satisfied_ef_ids: Set[str],
-    task: Dict
+    task: Dict,
+    ef_by_id: Optional[Dict[str, Dict]] = None,
+    meta: Optional[Dict] = None
 ) -> Tuple[bool, List[str]]:
     """
     Check if all required EFs are satisfied and return list of unsatisfied EFs.
@@ -144,24 +293,26 @@ def check_all_efs_satisfied(
         graph: Current mechanism graph
         satisfied_ef_ids: Set of EF IDs that are marked as satisfied
         task: Full task dictionary
+        ef_by_id: Optional pre-built {ef_id: ef} map (build once per synthesis run)
+        meta: Optional validator_metadata(task) (build once per synthesis run)
         
     Returns:
         Tuple of (all_satisfied, list_of_unsatisfied_ef_ids)
     """
-    all_ef_ids = {ef['ef_id'] for ef in task.get('elemental_functions', [])}
-    unsatisfied = all_ef_ids - satisfied_ef_ids
+    if meta is None:
+        meta = validator_metadata(task)
+    if ef_by_id is None:
+        ef_by_id = meta['ef_by_id']
+    all_ef_ids = meta['ef_ids']
     
-    # Additionally validate that satisfied EFs are actually valid
+    # Only EFs that are marked satisfied AND still validate on this graph count
     validated_satisfied = set()
     for ef_id in satisfied_ef_ids:
-        ef = next((e for e in task['elemental_functions'] if e['ef_id'] == ef_id), None)
-        if ef:
-            is_valid, _ = validate_ef_satisfaction(graph, ef, task)
-            if is_valid:
-                validated_satisfied.add(ef_id)
-            else:
-                unsatisfied.add(ef_id)  # Mark as unsatisfied if validation fails
+        ef = ef_by_id.get(ef_id)
+        if ef and validate_ef_satisfaction(graph, ef, task, meta)[0]:
+            validated_satisfied.add(ef_id)
     
-    all_satisfied = len(unsatisfied) == 0
-    return all_satisfied, list(unsatisfied)
-
+    if validated_satisfied >= all_ef_ids:
+        return True, []
+    unsatisfied = all_ef_ids - validated_satisfied
+    return False, list(unsatisfied)
@@ -1,18 +1,66 @@
 # src/initial_solution.py
-import json
 import os
-from typing import List, Dict, Any
+import re
+import sys
+import copy
+import functools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Tuple, NamedTuple, Callable, Optional
 from .mechanism_graph import MechanismGraph
-from .ai_retrieval import rank_mechanisms_by_similarity, rank_mechanisms_by_gemini
+from .ai_retrieval import rank_mechanisms_by_similarity, rank_mechanisms_by_gemini, rank_mechanisms_by_gemini_async
+
+try:
+    import orjson as _json  # Optional: faster knowledge base parsing
+except ImportError:
+    import json as _json
+
+_KB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'knowledge_base', 'building_blocks.json'
+)
+
+
+BehaviorKey = Tuple[Tuple[Any, Any], ...]
+
+
+def _behavior_key(behavior: List[Dict]) -> BehaviorKey:
+    """Canonical ((effort, motion), ...) key for a behavior list, compared by tuple equality."""
+    return tuple((state.get('effort'), state.get('motion')) for state in behavior)
+
+
+class _KnowledgeBase(NamedTuple):
+    blocks: List[Dict[str, Any]]
+    by_name: Dict[str, Dict[str, Any]]
+    behavior_index: Dict[BehaviorKey, List[Dict[str, Any]]]  # satisfied behavior -> blocks, in KB order
+    rotation_only_names: np.ndarray  # names of blocks converting rotation to rotation
+
+
+@functools.lru_cache(maxsize=4)
+def _parse_knowledge_base(kb_path: str, mtime_ns: int) -> _KnowledgeBase:
+    """Parse the knowledge base once per (path, mtime) and build its lookup indexes."""
+    # Read the whole file once and parse from bytes (both orjson and json accept bytes)
+    with open(kb_path, 'rb') as f:
+        building_blocks = _json.loads(f.read())['mechanisms']
+    behavior_index: Dict[BehaviorKey, List[Dict[str, Any]]] = {}
+    for block in building_blocks:
+        for key in dict.fromkeys(_behavior_key(es['behavior']) for es in block['satisfies_efs']):
+            behavior_index.setdefault(key, []).append(block)
+    rotation_only_names = np.array(
+        [b['name'] for b in building_blocks if 'rotation to rotation' in (b.get('motion_conversion') or '').lower()],
+        dtype=str
+    )
+    return _KnowledgeBase(building_blocks, {b['name']: b for b in building_blocks}, behavior_index, rotation_only_names)
+
+
+def _knowledge_base() -> _KnowledgeBase:
+    return _parse_knowledge_base(_KB_PATH, os.stat(_KB_PATH).st_mtime_ns)
+
 
 def _load_knowledge_base() -> List[Dict[str, Any]]:
-    """Helper to load the building blocks from the knowledge base."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    kb_path = os.path.join(project_root, 'knowledge_base', 'building_blocks.json')
-    
-    with open(kb_path, 'r') as f:
-        return json.load(f)['mechanisms']
+    """Helper to load the building blocks from the knowledge base (cached until the file changes)."""
+    return list(_knowledge_base().blocks)
+
 
 def _create_slider_crank() -> MechanismGraph:
     """Creates a slider-crank mechanism (4 elements) aligned with Door Latch task."""
@@ -27,10 +75,12 @@ def _create_slider_crank() -> MechanismGraph:
     graph.element_names = ['Ground', 'Crank', 'Slider', 'Coupler']  # Note name order matches index
     
     # Joints:
-    graph.add_joint(0, 1, 'R')  # Ground to Crank
-    graph.add_joint(1, 3, 'R')  # Crank to Coupler (E1 -> E3)
-    graph.add_joint(3, 2, 'R')  # Coupler to Slider (E3 -> E2)
-    graph.add_joint(0, 2, 'P')  # Ground to Slider (E0 -> E2) - This is what Validator looks for!
+    graph.add_joints([
+        (0, 1, 'R'),  # Ground to Crank
+        (1, 3, 'R'),  # Crank to Coupler (E1 -> E3)
+        (3, 2, 'R'),  # Coupler to Slider (E3 -> E2)
+        (0, 2, 'P'),  # Ground to Slider (E0 -> E2) - This is what Validator looks for!
+    ])
     
     return graph
 
@@ -39,9 +89,11 @@ def _create_rack_and_pinion() -> MechanismGraph:
     graph = MechanismGraph(num_elements=3)
     graph.element_names = ['Ground', 'Pinion', 'Rack']
     # E0=Ground, E1=Pinion, E2=Rack
-    graph.add_joint(0, 1, 'R')  # Ground to Pinion
-    graph.add_joint(1, 2, 'X')  # Pinion to Rack (higher pair)
-    graph.add_joint(0, 2, 'P')  # Ground to Rack (prismatic constraint)
+    graph.add_joints([
+        (0, 1, 'R'),  # Ground to Pinion
+        (1, 2, 'X'),  # Pinion to Rack (higher pair)
+        (0, 2, 'P'),  # Ground to Rack (prismatic constraint)
+    ])
     return graph
 
 def _create_four_bar_linkage() -> MechanismGraph:
@@ -49,10 +101,12 @@ def _create_four_bar_linkage() -> MechanismGraph:
     graph = MechanismGraph(num_elements=4)
     graph.element_names = ['Ground', 'Input', 'Coupler', 'Output']
     # E0=Ground, E1=Input, E2=Coupler, E3=Output
-    graph.add_joint(0, 1, 'R')  # Ground to Input
-    graph.add_joint(1, 2, 'R')  # Input to Coupler
-    graph.add_joint(2, 3, 'R')  # Coupler to Output
-    graph.add_joint(0, 3, 'R')  # Ground to Output
+    graph.add_joints([
+        (0, 1, 'R'),  # Ground to Input
+        (1, 2, 'R'),  # Input to Coupler
+        (2, 3, 'R'),  # Coupler to Output
+        (0, 3, 'R'),  # Ground to Output
+    ])
     return graph
 
 def _create_cam_follower() -> MechanismGraph:
@@ -60,39 +114,105 @@ def _create_cam_follower() -> MechanismGraph:
     graph = MechanismGraph(num_elements=3)
     graph.element_names = ['Ground', 'Cam', 'Follower']
     # E0=Ground, E1=Cam, E2=Follower
-    graph.add_joint(0, 1, 'R')  # Ground to Cam
-    graph.add_joint(1, 2, 'X')  # Cam to Follower (higher pair)
-    graph.add_joint(0, 2, 'P')  # Ground to Follower (prismatic constraint)
+    graph.add_joints([
+        (0, 1, 'R'),  # Ground to Cam
+        (1, 2, 'X'),  # Cam to Follower (higher pair)
+        (0, 2, 'P'),  # Ground to Follower (prismatic constraint)
+    ])
     return graph
 
 def _create_spur_gear_pair_external() -> MechanismGraph:
     """Creates an external spur gear pair mechanism (3 elements)."""
     graph = MechanismGraph(num_elements=3)
     # E0=Ground, E1=Gear A, E2=Gear B
-    graph.add_joint(0, 1, 'R')  # Ground to Gear A
-    graph.add_joint(1, 2, 'X')  # Gear mesh (higher pair)
-    graph.add_joint(0, 2, 'R')  # Ground to Gear B
+    graph.add_joints([
+        (0, 1, 'R'),  # Ground to Gear A
+        (1, 2, 'X'),  # Gear mesh (higher pair)
+        (0, 2, 'R'),  # Ground to Gear B
+    ])
     return graph
 
+# Known mechanism names -> graph builders for AI retrieval
+_BUILDERS: Dict[str, Callable[[], MechanismGraph]] = {
+    'Slider-Crank': _create_slider_crank,
+    'Rack and Pinion': _create_rack_and_pinion,
+    'Four-Bar Linkage': _create_four_bar_linkage,
+    'Cam-Follower': _create_cam_follower,
+    'Cam and Follower': _create_cam_follower,
+    'Spur Gear Pair (External)': _create_spur_gear_pair_external,
+}
+
+
+def _create_generic_four_bar_slider() -> MechanismGraph:
+    """Fallback 4-element graph (R-R-R loop closed by a prismatic joint to ground)."""
+    graph = MechanismGraph(num_elements=4)
+    graph.add_joints([
+        (0, 1, 'R'),
+        (1, 2, 'R'),
+        (2, 3, 'R'),
+        (0, 3, 'P'),
+    ])
+    return graph
+
+
+# Rule-based retrieval only knows these exact names; anything else (including the
+# Slider-Crank variants) gets the generic R-R-R-P graph
+_RULE_BASED_BUILDERS: Dict[str, Callable[[], MechanismGraph]] = {
+    'Slider-Crank': _create_slider_crank,
+    'Rack and Pinion': _create_rack_and_pinion,
+    'Four-Bar Linkage': _create_four_bar_linkage,
+    'Cam-Follower': _create_cam_follower,
+}
+
+
+# Each builder runs once; callers get a deep copy of the prototype graph
+_PROTOTYPES: Dict[Callable[[], MechanismGraph], MechanismGraph] = {
+    builder: builder() for builder in set(_BUILDERS.values()) | {_create_generic_four_bar_slider}
+}
+
+
+_PROTOTYPE_DOF: Dict[Callable[[], MechanismGraph], int] = {
+    builder: graph.calculate_dof() for builder, graph in _PROTOTYPES.items()
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _empty_graph_dof(num_elements: int) -> int:
+    """DOF of a joint-less graph with num_elements elements."""
+    return MechanismGraph(num_elements=num_elements).calculate_dof()
+
+
+def _builder_for(name: str) -> Optional[Callable[[], MechanismGraph]]:
+    """Return the graph builder for a mechanism name, or None if there is no specific one."""
+    builder = _BUILDERS.get(name)
+    if builder is None and "Slider-Crank" in name:
+        # Variations of Slider-Crank always get the base geometry
+        builder = _create_slider_crank
+    return builder
+
+
+def _build(builder: Callable[[], MechanismGraph]) -> MechanismGraph:
+    """Fresh graph for a builder, copied from its prebuilt prototype."""
+    prototype = _PROTOTYPES.get(builder)
+    return copy.deepcopy(prototype) if prototype is not None else builder()
+
+
 SIMILARITY_THRESHOLD = 0.1
 
+# Keywords implying the task needs translation (substring match, as before)
+_TRANSLATION_RE = re.compile(r'linear|translate|translation|slider|retract|inward|bolt', re.IGNORECASE)
 
-def _behavior_matches(ef_behavior: List[Dict], kb_behavior: List[Dict]) -> bool:
-    """
-    Checks if an EF behavior matches a knowledge base behavior.
-    This is a simplified matching used in the rule-based method.
-    """
-    if len(ef_behavior) != len(kb_behavior):
-        return False
-    for ef_state, kb_state in zip(ef_behavior, kb_behavior):
-        if (ef_state.get('effort') != kb_state.get('effort') or
-                ef_state.get('motion') != kb_state.get('motion')):
-            return False
-    return True
+
+def _flush_messages(msgs: List[str]) -> None:
+    """Write buffered progress lines to stdout in a single call and clear the buffer."""
+    if msgs:
+        sys.stdout.write("\n".join(msgs) + "\n")
+        msgs.clear()
 
 
 def _find_initial_solutions_rule_based(task: Dict[str, Any]) -> List[Dict[str, Any]]:
     initial_solutions: List[Dict[str, Any]] = []
+    msgs: List[str] = []
 
     # Find the first Type-1.1 EF to start with
     first_ef = None
@@ -102,55 +222,66 @@ def _find_initial_solutions_rule_based(task: Dict[str, Any]) -> List[Dict[str, A
             break
 
     if not first_ef:
-        print(" -> No 'Type-1.1' EF found to start the synthesis process.")
+        msgs.append(" -> No 'Type-1.1' EF found to start the synthesis process.")
+        _flush_messages(msgs)
         return []
 
-    print(f" -> Starting with EF1: '{first_ef['description']}'")
-    print(f" -> EF1 Behavior: {first_ef['behavior']}")
+    msgs.append(f" -> Starting with EF1: '{first_ef['description']}'")
+    msgs.append(f" -> EF1 Behavior: {first_ef['behavior']}")
 
     # Strategy: Check Knowledge Base for exact behavior matches
-    building_blocks = _load_knowledge_base()
-    print(f" -> Searching {len(building_blocks)} building blocks...")
+    kb = _knowledge_base()
+    building_blocks = kb.blocks
+    msgs.append(f" -> Searching {len(building_blocks)} building blocks...")
 
-    for block in building_blocks:
-        for ef_satisfied in block['satisfies_efs']:
-            if _behavior_matches(first_ef['behavior'], ef_satisfied['behavior']):
-                print(f" -> Found match in Knowledge Base: {block['name']}")
-
-                if block['name'] == "Slider-Crank":
-                    graph = _create_slider_crank()
-                elif block['name'] == "Rack and Pinion":
-                    graph = _create_rack_and_pinion()
-                elif block['name'] == "Four-Bar Linkage":
-                    graph = _create_four_bar_linkage()
-                elif block['name'] == "Cam-Follower":
-                    graph = _create_cam_follower()
-                else:
-                    graph = MechanismGraph(num_elements=4)
-                    graph.add_joint(0, 1, 'R')
-                    graph.add_joint(1, 2, 'R')
-                    graph.add_joint(2, 3, 'R')
-                    graph.add_joint(0, 3, 'P')
-
-                initial_solutions.append({
-                    "name": block['name'],
-                    "graph": graph,
-                    "source": "knowledge_base"
-                })
-                break
+    for block in kb.behavior_index.get(_behavior_key(first_ef['behavior']), []):
+        msgs.append(f" -> Found match in Knowledge Base: {block['name']}")
+
+        graph = _build(_RULE_BASED_BUILDERS.get(block['name'], _create_generic_four_bar_slider))
+
+        initial_solutions.append({
+            "name": block['name'],
+            "graph": graph,
+            "source": "knowledge_base"
+        })
 
     # No fallback: inform user if nothing matched
     if not initial_solutions:
-        print(" -> No suitable mechanisms found in the knowledge base for the requested EF.")
+        msgs.append(" -> No suitable mechanisms found in the knowledge base for the requested EF.")
 
+    _flush_messages(msgs)
     return initial_solutions
 
+def _build_and_validate(name: str, block: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Build the initial solution for one ranked AI candidate that passed the score and motion filters.
+
+    Returns (solution, None) on success, or (None, skip_message) when the candidate is rejected.
+    """
+    # Validate DOF == 1 for single-input mechanisms (from cached DOFs, before building)
+    builder = _builder_for(name)
+    num_elements = block.get('num_elements', 4)
+    dof = _PROTOTYPE_DOF[builder] if builder is not None else _empty_graph_dof(num_elements)
+    if dof != 1:
+        return None, f"   - Skipping '{name}' due to invalid DOF ({dof})"
+    if builder is not None:
+        graph = _build(builder)
+    else:
+        # Generic graph sized to block's num_elements
+        graph = MechanismGraph(num_elements=num_elements)
+    return {
+        "name": name,
+        "graph": graph,
+        "source": "ai_retrieval"
+    }, None
+
+
 def _find_initial_solutions_ai(task: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     AI-powered similarity search using Gemini AI.
     Considers full task context including all elemental functions.
     """
-    print("\n[PHASE 4.1] Finding Initial Solutions using Gemini AI Retrieval...")
+    msgs: List[str] = ["\n[PHASE 4.1] Finding Initial Solutions using Gemini AI Retrieval..."]
 
     initial_solutions: List[Dict[str, Any]] = []
 
@@ -162,78 +293,89 @@ def _find_initial_solutions_ai(task: Dict[str, Any]) -> List[Dict[str, Any]]:
             break
 
     if not first_ef:
-        print(" -> No 'Type-1.1' EF found to start the synthesis process.")
+        msgs.append(" -> No 'Type-1.1' EF found to start the synthesis process.")
+        _flush_messages(msgs)
         return []
 
     task_description = task.get('description', '')
     elemental_functions = task.get('elemental_functions', [])
     
-    print(f" -> Task: {task.get('task_name', 'Unknown')}")
-    print(f" -> Querying Gemini AI with full task context...")
+    msgs.append(f" -> Task: {task.get('task_name', 'Unknown')}")
+    msgs.append(f" -> Querying Gemini AI with full task context...")
+    # The ranking may wait on the network; show progress so far before it
+    _flush_messages(msgs)
+
+    # Check for translation keywords in Task Description AND all EF descriptions
+    # (single join; the regex is case-insensitive so no lowering is needed)
+    all_text = " ".join([task_description, *(ef.get('description', '') for ef in elemental_functions)])
+        
+    needs_translation = bool(_TRANSLATION_RE.search(all_text))
 
     # Use Gemini AI to rank mechanisms from the knowledge base
-    building_blocks = _load_knowledge_base()
-    ranked = rank_mechanisms_by_gemini(task_description, elemental_functions, building_blocks)
+    kb = _knowledge_base()
+    ranked = rank_mechanisms_by_gemini(task_description, elemental_functions, list(kb.blocks))
 
-    print(" -> Mechanism Similarity Ranking:")
+    msgs.append(" -> Mechanism Similarity Ranking:")
     for name, score in ranked:
-        print(f"   - {name}: {score:.2f}")
+        msgs.append(f"   - {name}: {score:.2f}")
 
     # Create solution objects for all matches above the threshold
-    kb_name_to_block = {b['name']: b for b in building_blocks}
-    
-    # Check for translation keywords in Task Description AND all EF descriptions
-    all_text = task_description.lower()
-    for ef in elemental_functions:
-        all_text += " " + ef.get('description', '').lower()
-        
-    needs_translation = any(k in all_text for k in ["linear", "translate", "translation", "slider", "retract", "inward", "bolt"])
 
-    for name, score in ranked:
-        if score > SIMILARITY_THRESHOLD:
-            # Optional motion intent filter: if EF implies translation, avoid pure rotation-to-rotation mechanisms
-            block = kb_name_to_block.get(name, {})
-            motion_conv = (block.get('motion_conversion') or '').lower()
-            if needs_translation and 'rotation to rotation' in motion_conv:
-                print(f"   - Skipping '{name}' due to motion type mismatch with EF intent")
-                continue
-
-            # UPDATE: Handle variations of Slider-Crank
-            if "Slider-Crank" in name:
-                graph = _create_slider_crank()  # Always give it the base geometry
-            elif name == "Rack and Pinion":
-                graph = _create_rack_and_pinion()
-            elif name == "Four-Bar Linkage":
-                graph = _create_four_bar_linkage()
-            elif name in ("Cam-Follower", "Cam and Follower"):
-                graph = _create_cam_follower()
-            elif name == "Spur Gear Pair (External)":
-                graph = _create_spur_gear_pair_external()
-            else:
-                # Generic graph sized to block's num_elements
-                num_elements = kb_name_to_block.get(name, {}).get('num_elements', 4)
-                graph = MechanismGraph(num_elements=num_elements)
-            # Validate DOF == 1 for single-input mechanisms
-            if graph.calculate_dof() != 1:
-                print(f"   - Skipping '{name}' due to invalid DOF ({graph.calculate_dof()})")
-                continue
-            initial_solutions.append({
-                "name": name,
-                "graph": graph,
-                "source": "ai_retrieval"
-            })
+    # Filter the ranking as arrays: score threshold, then (if EF implies translation)
+    # drop pure rotation-to-rotation mechanisms. Order is by descending score (stable).
+    names = np.array([name for name, _ in ranked], dtype=str)
+    scores = np.array([score for _, score in ranked], dtype=float)
+    order = np.argsort(-scores, kind='stable')
+    names, scores = names[order], scores[order]
+    above = scores > SIMILARITY_THRESHOLD
+    motion_mismatch = above & np.isin(names, kb.rotation_only_names) if needs_translation else np.zeros_like(above)
+    candidates = names[above & ~motion_mismatch].tolist()
+
+    # Candidates are independent: build/validate them concurrently, then report in rank order
+    results = []
+    if candidates:
+        blocks = [kb.by_name.get(name, {}) for name in candidates]
+        with ThreadPoolExecutor(max_workers=min(8, len(candidates))) as executor:
+            results = list(executor.map(_build_and_validate, candidates, blocks))
+    built = iter(results)
+    for name, mismatch in zip(names[above].tolist(), motion_mismatch[above].tolist()):
+        if mismatch:
+            msgs.append(f"   - Skipping '{name}' due to motion type mismatch with EF intent")
+            continue
+        solution, message = next(built)
+        if message:
+            msgs.append(message)
+        if solution is not None:
+            initial_solutions.append(solution)
 
     # No fallback: inform user if nothing matched
     if not initial_solutions:
-        print(" -> No sufficiently similar mechanism found in the knowledge base for the requested EF.")
+        msgs.append(" -> No sufficiently similar mechanism found in the knowledge base for the requested EF.")
 
-    print(f" -> Found {len(initial_solutions)} initial solution(s)")
+    msgs.append(f" -> Found {len(initial_solutions)} initial solution(s)")
     for sol in initial_solutions:
-        print(f"   - {sol['name']} (DOF: {sol['graph'].calculate_dof()}, Source: {sol['source']})")
+        msgs.append(f"   - {sol['name']} (DOF: {sol['graph'].calculate_dof()}, Source: {sol['source']})")
 
+    _flush_messages(msgs)
     return initial_solutions
 
 
+async def prefetch_ai_ranking(task: Dict[str, Any]) -> None:
+    """
+    Issue the Gemini ranking request used by the AI retrieval ahead of time.
+
+    The result is memoized in ai_retrieval, so a later find_initial_solutions(task, 'ai')
+    in the same process reuses it instead of waiting on the network.
+    """
+    if not any(ef.get('type') == 'Type-1.1' for ef in task.get('elemental_functions', [])):
+        return
+    await rank_mechanisms_by_gemini_async(
+        task.get('description', ''),
+        task.get('elemental_functions', []),
+        _load_knowledge_base()
+    )
+
+
 def find_initial_solutions(task: Dict[str, Any], method: str = 'ai') -> List[Dict[str, Any]]:
     """
     Find initial solution proposals using the selected retrieval method.
@@ -253,7 +395,7 @@ def find_initial_solutions(task: Dict[str, Any], method: str = 'ai') -> List[Dic
     else:
         solutions = _find_initial_solutions_ai(task)
 
-    print(f" -> Found {len(solutions)} initial solution(s)")
-    for sol in solutions:
-        print(f"   - {sol['name']} (DOF: {sol['graph'].calculate_dof()}, Source: {sol['source']})")
+    msgs = [f" -> Found {len(solutions)} initial solution(s)"]
+    msgs.extend(f"   - {sol['name']} (DOF: {sol['graph'].calculate_dof()}, Source: {sol['source']})" for sol in solutions)
+    _flush_messages(msgs)
     return solutions
@@ -1,5 +1,129 @@
+import math
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, NamedTuple
+
+try:
+    from numba import njit  # Optional: JIT for the trajectory kernels
+except ImportError:
+    njit = None
+
+# Traces only feed on-screen drawing, so single precision is plenty; every
+# output array follows the dtype of the input angles.
+_SIM_DTYPE = np.float32
+
+
+# Simulation traces are stored as one array per quantity (structure of arrays).
+# frame(i) / frames() rebuild the per-frame dicts used by the animation code.
+
+class SliderCrankTrace(NamedTuple):
+    """Slider-crank trace: crank tip (Ax, Ay), slider (Bx, By) and input angle per frame."""
+    Ax: np.ndarray
+    Ay: np.ndarray
+    Bx: np.ndarray
+    By: np.ndarray
+    angle: np.ndarray
+
+    def frame(self, i: int) -> Dict:
+        a = (float(self.Ax[i]), float(self.Ay[i]))
+        b = (float(self.Bx[i]), float(self.By[i]))
+        return {'crank': [(0, 0), a], 'coupler': [a, b], 'slider': b, 'angle': float(self.angle[i])}
+
+    def frames(self) -> List[Dict]:
+        return [
+            {'crank': [(0, 0), (ax, ay)], 'coupler': [(ax, ay), (bx, by)], 'slider': (bx, by), 'angle': theta}
+            for ax, ay, bx, by, theta in zip(self.Ax.tolist(), self.Ay.tolist(), self.Bx.tolist(), self.By.tolist(), self.angle.tolist())
+        ]
+
+
+class RackPinionTrace(NamedTuple):
+    """Rack-and-pinion trace: fixed pinion center, rotating marker and rack position per frame."""
+    pinion_center: Tuple[float, float]
+    marker_x: np.ndarray
+    marker_y: np.ndarray
+    rack_x: np.ndarray
+    angle: np.ndarray
+
+    def frame(self, i: int) -> Dict:
+        return {
+            'pinion_center': self.pinion_center,
+            'pinion_marker': (float(self.marker_x[i]), float(self.marker_y[i])),
+            'rack_x': float(self.rack_x[i]),
+            'angle': float(self.angle[i])
+        }
+
+    def frames(self) -> List[Dict]:
+        return [
+            {'pinion_center': self.pinion_center, 'pinion_marker': (mx, my), 'rack_x': rx, 'angle': theta}
+            for mx, my, rx, theta in zip(self.marker_x.tolist(), self.marker_y.tolist(), self.rack_x.tolist(), self.angle.tolist())
+        ]
+
+
+class CamFollowerTrace(NamedTuple):
+    """Cam-follower trace: cam geometric center and follower height per frame."""
+    cam_cx: np.ndarray
+    cam_cy: np.ndarray
+    follower_y: np.ndarray
+    angle: np.ndarray
+
+    def frame(self, i: int) -> Dict:
+        return {
+            'cam_center': (float(self.cam_cx[i]), float(self.cam_cy[i])),
+            'follower_y': float(self.follower_y[i]),
+            'angle': float(self.angle[i])
+        }
+
+    def frames(self) -> List[Dict]:
+        return [
+            {'cam_center': (cx, cy), 'follower_y': fy, 'angle': theta}
+            for cx, cy, fy, theta in zip(self.cam_cx.tolist(), self.cam_cy.tolist(), self.follower_y.tolist(), self.angle.tolist())
+        ]
+
+
+# Trajectory kernels take a precomputed cos/sin table of the input angle and write
+# into preallocated output arrays. The scalar loops are compiled with numba when it
+# is installed; otherwise the numpy versions run.
+
+def _slider_crank_kernel_loop(cos_t, sin_t, r2, r3, offset, Ax, Ay, Bx, By):
+    for i in range(cos_t.shape[0]):
+        ax = r2 * cos_t[i]
+        ay = r2 * sin_t[i]
+        term = r3 * r3 - (offset - ay) * (offset - ay)
+        Ax[i] = ax
+        Ay[i] = ay
+        Bx[i] = ax + math.sqrt(term if term > 0.0 else 0.0)
+        By[i] = offset
+
+
+def _slider_crank_kernel_numpy(cos_t, sin_t, r2, r3, offset, Ax, Ay, Bx, By):
+    np.multiply(r2, cos_t, out=Ax)
+    np.multiply(r2, sin_t, out=Ay)
+    np.add(Ax, np.sqrt(np.maximum(r3**2 - (offset - Ay)**2, 0.0)), out=Bx)
+    By.fill(offset)
+
+
+def _cam_follower_kernel_loop(cos_t, sin_t, cam_radius, eccentricity, cam_cx, cam_cy, follower_y):
+    for i in range(cos_t.shape[0]):
+        cx = eccentricity * cos_t[i]
+        cy = eccentricity * sin_t[i]
+        term = cam_radius * cam_radius - cx * cx
+        cam_cx[i] = cx
+        cam_cy[i] = cy
+        follower_y[i] = cy + math.sqrt(term if term > 0.0 else 0.0)
+
+
+def _cam_follower_kernel_numpy(cos_t, sin_t, cam_radius, eccentricity, cam_cx, cam_cy, follower_y):
+    np.multiply(eccentricity, cos_t, out=cam_cx)
+    np.multiply(eccentricity, sin_t, out=cam_cy)
+    np.add(cam_cy, np.sqrt(np.maximum(cam_radius**2 - cam_cx**2, 0.0)), out=follower_y)
+
+
+if njit is not None:
+    _slider_crank_kernel = njit(cache=True)(_slider_crank_kernel_loop)
+    _cam_follower_kernel = njit(cache=True)(_cam_follower_kernel_loop)
+else:
+    _slider_crank_kernel = _slider_crank_kernel_numpy
+    _cam_follower_kernel = _cam_follower_kernel_numpy
+
 
 class KinematicSimulator:
     """
@@ -9,127 +133,101 @@ class KinematicSimulator:
     def __init__(self):
         pass
 
-    def simulate_slider_crank(self, num_frames: int = 50) -> List[Dict]:
+    def _trig_table(self, num_frames: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Input angles over one full turn (0 to 360 degrees) with their cosines and sines."""
+        thetas = np.linspace(0, 2*np.pi, num_frames, dtype=_SIM_DTYPE)
+        return thetas, np.cos(thetas), np.sin(thetas)
+
+    def simulate_all(self, num_frames: int = 50) -> Dict[str, NamedTuple]:
+        """
+        Simulates every supported mechanism for one render pass.
+        The full-turn mechanisms share a single trig table; the rack-and-pinion
+        oscillates over its own (mirrored) angle range and computes its own.
+        """
+        trig = self._trig_table(num_frames)
+        return {
+            'slider_crank': self._slider_crank_from_trig(*trig),
+            'rack_pinion': self.simulate_rack_pinion(num_frames),
+            'cam_follower': self._cam_follower_from_trig(*trig),
+        }
+
+    def simulate_slider_crank(self, num_frames: int = 50) -> SliderCrankTrace:
         """
         Simulates a slider-crank mechanism.
-        Returns a list of frames, where each frame contains coordinates for:
+        Returns a SliderCrankTrace; each frame (trace.frame(i)) contains coordinates for:
         - Crank (p1, p2)
         - Coupler (p2, p3)
         - Slider (p3)
         """
-        frames = []
-        
+        return self._slider_crank_from_trig(*self._trig_table(num_frames))
+
+    def _slider_crank_from_trig(self, thetas: np.ndarray, cos_t: np.ndarray, sin_t: np.ndarray) -> SliderCrankTrace:
         # Dimensions
         r2 = 1.5  # Crank length
         r3 = 4.0  # Coupler length
         offset = 0.0 # Slider offset
         
-        # Input angles (0 to 360 degrees)
-        thetas = np.linspace(0, 2*np.pi, num_frames)
+        # Crank end point (A) = r2 * (cos, sin)
+        # Slider position (B)
+        # The slider moves along y = offset line.
+        # The distance between Crank Tip A and Slider B is length r3.
+        # (Bx - Ax)^2 + (By - Ay)^2 = r3^2
+        # (Bx - Ax)^2 = r3^2 - (offset - Ay)^2
+        # Bx = Ax + sqrt(r3^2 - (offset - Ay)^2)  (Assuming slider is to the right)
+        # Negative terms should not happen with valid dimensions; clamp to 0.
+        Ax, Ay, Bx, By = (np.empty_like(thetas) for _ in range(4))
+        _slider_crank_kernel(cos_t, sin_t, r2, r3, offset, Ax, Ay, Bx, By)
         
-        for theta in thetas:
-            # Crank end point (A)
-            Ax = r2 * np.cos(theta)
-            Ay = r2 * np.sin(theta)
-            
-            # Slider position (B)
-            # The slider moves along y = offset line.
-            # The distance between Crank Tip A and Slider B is length r3.
-            # (Bx - Ax)^2 + (By - Ay)^2 = r3^2
-            # (Bx - Ax)^2 = r3^2 - (offset - Ay)^2
-            # Bx = Ax + sqrt(r3^2 - (offset - Ay)^2)  (Assuming slider is to the right)
-            
-            term = r3**2 - (offset - Ay)**2
-            if term < 0:
-                term = 0 # Should not happen with valid dimensions
-                
-            Bx = Ax + np.sqrt(term)
-            By = offset
-            
-            frames.append({
-                'crank': [(0, 0), (Ax, Ay)],
-                'coupler': [(Ax, Ay), (Bx, By)],
-                'slider': (Bx, By),
-                'angle': theta
-            })
-            
-        return frames
-
-    def simulate_rack_pinion(self, num_frames: int = 50) -> List[Dict]:
+        return SliderCrankTrace(Ax, Ay, Bx, By, thetas)
+
+    def simulate_rack_pinion(self, num_frames: int = 50) -> RackPinionTrace:
         """
         Simulates a rack and pinion mechanism.
         """
-        frames = []
-        
         # Dimensions
         radius = 1.0
         
         # Input angles (oscillating for door latch effect: 0 -> 90 -> 0)
         # Phase 1: 0 to 90
-        t1 = np.linspace(0, np.pi/2, num_frames // 2)
-        # Phase 2: 90 to 0
-        t2 = np.linspace(np.pi/2, 0, num_frames // 2)
-        thetas = np.concatenate([t1, t2])
+        t1 = np.linspace(0, np.pi/2, num_frames // 2, dtype=_SIM_DTYPE)
+        # Phase 2: 90 to 0, the mirror of phase 1, so its trig is reused reversed
+        cos_t1, sin_t1 = np.cos(t1), np.sin(t1)
+        thetas = np.concatenate([t1, t1[::-1]])
         
         center_x, center_y = 2.0, 1.0
         
-        for theta in thetas:
-            # Pinion rotation marker
-            marker_x = center_x + radius * np.cos(theta)
-            marker_y = center_y + radius * np.sin(theta)
-            
-            # Rack position (x = r * theta)
-            # Initial rack pos at theta=0
-            # Rack is below pinion. y = center_y - radius = 0.0
-            # Let's align rack top with pinion bottom.
-            
-            rack_start_x = 0.0
-            rack_displacement = radius * theta
-            
-            current_rack_x = rack_start_x + rack_displacement
-            
-            frames.append({
-                'pinion_center': (center_x, center_y),
-                'pinion_marker': (marker_x, marker_y),
-                'rack_x': current_rack_x,
-                'angle': theta
-            })
-            
-        return frames
-
-    def simulate_cam_follower(self, num_frames: int = 50) -> List[Dict]:
+        # Pinion rotation marker
+        marker_x = center_x + radius * np.concatenate([cos_t1, cos_t1[::-1]])
+        marker_y = center_y + radius * np.concatenate([sin_t1, sin_t1[::-1]])
+        
+        # Rack position (x = r * theta)
+        # Initial rack pos at theta=0
+        # Rack is below pinion. y = center_y - radius = 0.0
+        # Let's align rack top with pinion bottom.
+        rack_start_x = 0.0
+        current_rack_x = rack_start_x + radius * thetas
+        
+        return RackPinionTrace((center_x, center_y), marker_x, marker_y, current_rack_x, thetas)
+
+    def simulate_cam_follower(self, num_frames: int = 50) -> CamFollowerTrace:
         """
         Simulates a simple cam-follower (eccentric cam).
         """
-        frames = []
-        
+        return self._cam_follower_from_trig(*self._trig_table(num_frames))
+
+    def _cam_follower_from_trig(self, thetas: np.ndarray, cos_t: np.ndarray, sin_t: np.ndarray) -> CamFollowerTrace:
         # Dimensions
         cam_radius = 1.0
         eccentricity = 0.5
         
-        thetas = np.linspace(0, 2*np.pi, num_frames)
-        
         center_x, center_y = 0.0, 0.0
         
-        for theta in thetas:
-            # Cam geometric center rotates around the shaft (0,0)
-            cam_cx = eccentricity * np.cos(theta)
-            cam_cy = eccentricity * np.sin(theta)
-            
-            # Follower sits on top of the cam at x=0
-            # Intersection of vertical line x=0 and circle (x-cx)^2 + (y-cy)^2 = R^2
-            # (-cx)^2 + (y-cy)^2 = R^2
-            # y = cy + sqrt(R^2 - cx^2)
-            
-            term = cam_radius**2 - cam_cx**2
-            if term < 0: term = 0
-            
-            follower_y = cam_cy + np.sqrt(term)
-            
-            frames.append({
-                'cam_center': (cam_cx, cam_cy),
-                'follower_y': follower_y,
-                'angle': theta
-            })
-            
-        return frames
+        # Cam geometric center rotates around the shaft (0,0)
+        # Follower sits on top of the cam at x=0
+        # Intersection of vertical line x=0 and circle (x-cx)^2 + (y-cy)^2 = R^2
+        # (-cx)^2 + (y-cy)^2 = R^2
+        # y = cy + sqrt(R^2 - cx^2)
+        cam_cx, cam_cy, follower_y = (np.empty_like(thetas) for _ in range(3))
+        _cam_follower_kernel(cos_t, sin_t, cam_radius, eccentricity, cam_cx, cam_cy, follower_y)
+        
+        return CamFollowerTrace(cam_cx, cam_cy, follower_y, thetas)
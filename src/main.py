@@ -6,6 +6,9 @@ from mechanism_graph import MechanismGraph
 from initial_solution import find_initial_solutions
 from synthesis_engine import run_synthesis_for_all_initial_solutions
 
+# Resolved once at import; the demos load their files relative to the project root
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 def load_json_file(filepath: str) -> dict:
     """
     A helper function to load and parse a JSON file.
@@ -35,10 +38,12 @@ def create_slider_crank() -> MechanismGraph:
     """
     # E0=Ground, E1=Crank, E2=Coupler, E3=Slider
     slider_crank = MechanismGraph(num_elements=4)
-    slider_crank.add_joint(0, 1, 'R')  # Ground to Crank
-    slider_crank.add_joint(1, 2, 'R')  # Crank to Coupler
-    slider_crank.add_joint(2, 3, 'R')  # Coupler to Slider
-    slider_crank.add_joint(0, 3, 'P')  # Ground to Slider (prismatic constraint)
+    slider_crank.add_joints([
+        (0, 1, 'R'),  # Ground to Crank
+        (1, 2, 'R'),  # Crank to Coupler
+        (2, 3, 'R'),  # Coupler to Slider
+        (0, 3, 'P'),  # Ground to Slider (prismatic constraint)
+    ])
     return slider_crank
 
 def create_four_bar_linkage() -> MechanismGraph:
@@ -50,10 +55,12 @@ def create_four_bar_linkage() -> MechanismGraph:
     """
     # E0=Ground, E1=Input, E2=Coupler, E3=Output
     four_bar = MechanismGraph(num_elements=4)
-    four_bar.add_joint(0, 1, 'R')  # Ground to Input
-    four_bar.add_joint(1, 2, 'R')  # Input to Coupler
-    four_bar.add_joint(2, 3, 'R')  # Coupler to Output
-    four_bar.add_joint(0, 3, 'R')  # Ground to Output
+    four_bar.add_joints([
+        (0, 1, 'R'),  # Ground to Input
+        (1, 2, 'R'),  # Input to Coupler
+        (2, 3, 'R'),  # Coupler to Output
+        (0, 3, 'R'),  # Ground to Output
+    ])
     return four_bar
 
 def run_phase1_demo():
@@ -65,13 +72,9 @@ def run_phase1_demo():
     # 1. Load Knowledge and Task Files
     print("\n[1] Loading knowledge base and design task...")
     
-    # Get the directory of the current script
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    
-    door_latch_task = load_json_file(os.path.join(project_root, 'tasks', 'door_latch_task.json'))
-    building_blocks = load_json_file(os.path.join(project_root, 'knowledge_base', 'building_blocks.json'))
-    rules = load_json_file(os.path.join(project_root, 'knowledge_base', 'transformation_rules.json'))
+    door_latch_task = load_json_file(os.path.join(_PROJECT_ROOT, 'tasks', 'door_latch_task.json'))
+    building_blocks = load_json_file(os.path.join(_PROJECT_ROOT, 'knowledge_base', 'building_blocks.json'))
+    rules = load_json_file(os.path.join(_PROJECT_ROOT, 'knowledge_base', 'transformation_rules.json'))
 
     if not all([door_latch_task, building_blocks, rules]):
         print("Failed to load one or more files. Exiting.")
@@ -149,10 +152,7 @@ def run_phase2_demo():
     print("=" * 60)
 
     # 1. Load Task
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    
-    task = load_json_file(os.path.join(project_root, 'tasks', 'door_latch_task.json'))
+    task = load_json_file(os.path.join(_PROJECT_ROOT, 'tasks', 'door_latch_task.json'))
     if not task:
         print("Failed to load task file. Exiting.")
         return
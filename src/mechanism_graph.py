@@ -1,8 +1,26 @@
 # src/mechanism_graph.py
+import copy
+import functools
+from collections import defaultdict
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.patches import FancyArrowPatch
 import networkx as nx
-from typing import List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
+
+# Free adjacency buffers keyed by (n, dtype), refilled by MechanismGraph.release()
+# and drawn from by clone(); capped so a burst of rejections cannot grow it unbounded.
+_GRAPH_POOL: Dict[Tuple[int, str], List[np.ndarray]] = defaultdict(list)
+_GRAPH_POOL_MAX = 64
+
+@functools.lru_cache(maxsize=1024)
+def _layout_for(adj_bytes: bytes, n: int, dtype: str) -> dict:
+    """Spring layout for an adjacency matrix, seeded so a topology is always drawn the same way."""
+    G = nx.from_numpy_array(np.frombuffer(adj_bytes, dtype=dtype).reshape(n, n))
+    return nx.spring_layout(G, seed=42)
+
 
 class MechanismGraph:
     """
@@ -17,6 +35,8 @@ class MechanismGraph:
         'SP': 6,   # Spring Prismatic
         'LSP': 7   # Limited Spring Prismatic (Stopper + Spring)
     }
+    # Reverse lookup: joint code -> joint type
+    _JOINT_MAP_INV = {code: joint_type for joint_type, code in JOINT_MAP.items()}
 
     def __init__(self, num_elements: int):
         """
@@ -30,6 +50,49 @@ class MechanismGraph:
         self.num_elements = num_elements
         self.adj_matrix = np.zeros((num_elements, num_elements), dtype=int)
         self.element_names = [f"E{i}" for i in range(num_elements)]
+        # (adjacency bytes, dof) from the last calculate_dof(); the key also catches
+        # callers that edit adj_matrix directly instead of through add_joint(s)
+        self._dof_cache: Optional[Tuple[bytes, int]] = None
+
+    def __deepcopy__(self, memo: dict) -> 'MechanismGraph':
+        """Copy arrays and lists directly; only other attributes go through deepcopy."""
+        clone = self.__class__.__new__(self.__class__)
+        memo[id(self)] = clone
+        for key, value in self.__dict__.items():
+            if isinstance(value, np.ndarray):
+                value = value.copy()
+            elif isinstance(value, list):
+                value = list(value)
+            else:
+                value = copy.deepcopy(value, memo)
+            setattr(clone, key, value)
+        return clone
+
+    def clone(self) -> 'MechanismGraph':
+        """
+        Cheap copy for search successors: a private adjacency matrix, every other
+        attribute shared with this graph (element_names is replaced, never mutated).
+        """
+        clone = self.__class__.__new__(self.__class__)
+        clone.__dict__.update(self.__dict__)
+        try:
+            buffer = _GRAPH_POOL[(self.num_elements, self.adj_matrix.dtype.str)].pop()
+        except IndexError:
+            clone.adj_matrix = self.adj_matrix.copy()
+        else:
+            np.copyto(buffer, self.adj_matrix)
+            clone.adj_matrix = buffer
+        return clone
+
+    def release(self) -> None:
+        """
+        Return this graph's adjacency matrix to the clone pool. The graph must not be
+        used afterwards (only call it on a discarded search successor).
+        """
+        pool = _GRAPH_POOL[(self.num_elements, self.adj_matrix.dtype.str)]
+        if len(pool) < _GRAPH_POOL_MAX:
+            pool.append(self.adj_matrix)
+        self.adj_matrix = None
 
     def add_joint(self, elem1_idx: int, elem2_idx: int, joint_type: str) -> None:
         """
@@ -46,6 +109,27 @@ class MechanismGraph:
         joint_code = self.JOINT_MAP[joint_type.upper()]
         self.adj_matrix[elem1_idx, elem2_idx] = joint_code
         self.adj_matrix[elem2_idx, elem1_idx] = joint_code
+        self._dof_cache = None
+
+    def add_joints(self, joints: Iterable[Tuple[int, int, str]]) -> None:
+        """
+        Adds several joints at once with a single (symmetric) matrix assignment.
+        
+        Args:
+            joints: Iterable of (elem1_idx, elem2_idx, joint_type) tuples
+        """
+        joints = list(joints)
+        if not joints:
+            return
+        us, vs, joint_types = zip(*joints)
+        codes = []
+        for joint_type in joint_types:
+            if joint_type.upper() not in self.JOINT_MAP:
+                raise ValueError(f"Unknown joint type: {joint_type}. Use one of {list(self.JOINT_MAP.keys())}")
+            codes.append(self.JOINT_MAP[joint_type.upper()])
+        self.adj_matrix[us, vs] = codes
+        self.adj_matrix[vs, us] = codes
+        self._dof_cache = None
 
     def calculate_dof(self) -> int:
         """
@@ -55,25 +139,27 @@ class MechanismGraph:
         Returns:
             int: Degrees of freedom of the mechanism
         """
+        key = self.adj_matrix.tobytes()
+        if self._dof_cache is not None and self._dof_cache[0] == key:
+            return self._dof_cache[1]
+
         n0 = self.num_elements  # Total number of elements (links)
         
         # We only need to look at the upper triangle to avoid double counting
         upper_triangle = self.adj_matrix[np.triu_indices(n0, k=1)]
         
-        n_minus_1 = np.count_nonzero(upper_triangle == -1)  # Number of fixed joints (F)
+        # Count every joint code in one pass; codes are shifted by +1 so F (-1) lands in bin 0
+        counts = np.bincount(upper_triangle + 1, minlength=9)
         
-        # UPDATE: Include Code 7 (LSP) in the 1-DOF count
-        n_1 = np.count_nonzero(
-            (upper_triangle == 1) | 
-            (upper_triangle == 3) | 
-            (upper_triangle == 5) | 
-            (upper_triangle == 6) |
-            (upper_triangle == 7) 
-        )
+        n_minus_1 = int(counts[0])  # Number of fixed joints (F)
         
-        n_2 = np.count_nonzero(upper_triangle == 2)        # Number of higher pairs (X)
+        # UPDATE: Include Code 7 (LSP) in the 1-DOF count (codes 1, 3, 5, 6, 7)
+        n_1 = int(counts[2] + counts[4] + counts[6] + counts[7] + counts[8])
+        
+        n_2 = int(counts[3])        # Number of higher pairs (X)
 
         dof = 3 * (n0 - n_minus_1 - 1) - (2 * n_1) - n_2
+        self._dof_cache = (key, dof)
         return dof
 
     def get_joint_info(self) -> List[Tuple[int, int, str]]:
@@ -83,14 +169,14 @@ class MechanismGraph:
         Returns:
             List[Tuple[int, int, str]]: List of (element1, element2, joint_type) tuples
         """
-        joints = []
-        for i in range(self.num_elements):
-            for j in range(i + 1, self.num_elements):
-                if self.adj_matrix[i, j] != 0:
-                    joint_code = self.adj_matrix[i, j]
-                    joint_type = [key for key, value in self.JOINT_MAP.items() if value == joint_code][0]
-                    joints.append((i, j, joint_type))
-        return joints
+        # Upper triangle only (each joint once), row-major like the matrix itself
+        rows, cols = np.triu_indices(self.num_elements, k=1)
+        codes = self.adj_matrix[rows, cols]
+        mask = codes != 0
+        return [
+            (i, j, self._JOINT_MAP_INV[code])
+            for i, j, code in zip(rows[mask].tolist(), cols[mask].tolist(), codes[mask].tolist())
+        ]
 
     def visualize(self, title: str = "Mechanism Topology Graph", save_path: Optional[str] = None, highlight_nodes: Optional[List[int]] = None, force_directions: Optional[dict] = None) -> None:
         """
@@ -100,18 +186,40 @@ class MechanismGraph:
             title (str): Title for the plot
             save_path (str, optional): Path to save the plot as image file
         """
+        if save_path:
+            # Saved silently: a private Agg figure, never registered with pyplot
+            fig = Figure(figsize=(10, 8))
+            FigureCanvasAgg(fig)
+            self.draw(fig.add_subplot(), title=title, highlight_nodes=highlight_nodes, force_directions=force_directions)
+            fig.savefig(save_path, dpi=300, bbox_inches='tight')
+            print(f"Graph saved to {save_path}")
+        else:
+            plt.figure(figsize=(10, 8))
+            self.draw(plt.gca(), title=title, highlight_nodes=highlight_nodes, force_directions=force_directions)
+            plt.show()
+
+    def draw(self, ax, title: str = "Mechanism Topology Graph", highlight_nodes: Optional[List[int]] = None, force_directions: Optional[dict] = None) -> None:
+        """
+        Draws the graph onto an existing Matplotlib axes (no pyplot state involved,
+        so it is safe to use with a private Figure off the main thread).
+        
+        Args:
+            ax: Axes to draw on
+            title (str): Title for the plot
+            highlight_nodes (list, optional): Element indices drawn in a highlight color
+            force_directions (dict, optional): Element index -> (dx, dy) arrow to draw
+        """
         G = nx.from_numpy_array(self.adj_matrix)
-        pos = nx.spring_layout(G)  # positions for all nodes
+        # positions for all nodes (cached per topology; treat as read-only)
+        pos = _layout_for(self.adj_matrix.tobytes(), self.num_elements, self.adj_matrix.dtype.str)
         
         edge_labels = {}
         for u, v, data in G.edges(data=True):
             joint_code = data['weight']
             # Find the joint type from the code
-            joint_type = [key for key, value in self.JOINT_MAP.items() if value == joint_code][0]
+            joint_type = self._JOINT_MAP_INV[joint_code]
             edge_labels[(u, v)] = joint_type
 
-        plt.figure(figsize=(10, 8))
-        
         # Create labels dictionary
         labels = {i: name for i, name in enumerate(self.element_names)}
         
@@ -123,18 +231,16 @@ class MechanismGraph:
             else:
                 node_colors.append('skyblue')
 
-        nx.draw(G, pos, with_labels=True, labels=labels, node_color=node_colors, node_size=2000, 
+        nx.draw(G, pos, ax=ax, with_labels=True, labels=labels, node_color=node_colors, node_size=2000, 
             edge_color='gray', font_size=10, font_weight='bold')
-        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, font_color='red', font_size=10)
+        nx.draw_networkx_edge_labels(G, pos, edge_labels=edge_labels, ax=ax, font_color='red', font_size=10)
         
-        plt.title(title, fontsize=14, fontweight='bold')
-        plt.axis('off')
+        ax.set_title(title, fontsize=14, fontweight='bold')
+        ax.axis('off')
         
         # Draw force arrows if provided
         try:
-            from matplotlib.patches import FancyArrowPatch
             if force_directions:
-                ax = plt.gca()
                 for node_idx, vec in force_directions.items():
                     if node_idx in pos:
                         start = pos[node_idx]
@@ -144,13 +250,6 @@ class MechanismGraph:
         except Exception:
             pass
 
-        if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
-            print(f"Graph saved to {save_path}")
-            plt.close()
-        else:
-            plt.show()
-
     def is_connected(self) -> bool:
         """
         Checks if the mechanism graph is connected.
@@ -158,8 +257,16 @@ class MechanismGraph:
         Returns:
             bool: True if all elements are connected, False otherwise
         """
-        G = nx.from_numpy_array(self.adj_matrix)
-        return nx.is_connected(G)
+        # Breadth-first search from element 0 on the dense matrix: each step adds
+        # every unseen element joined to the current frontier.
+        linked = self.adj_matrix != 0
+        seen = np.zeros(self.num_elements, dtype=bool)
+        seen[0] = True
+        frontier = seen.copy()
+        while frontier.any():
+            frontier = linked[frontier].any(axis=0) & ~seen
+            seen |= frontier
+        return bool(seen.all())
 
     def get_connectivity_info(self) -> dict:
         """
@@ -169,10 +276,11 @@ class MechanismGraph:
             dict: Dictionary containing connectivity statistics
         """
         G = nx.from_numpy_array(self.adj_matrix)
+        connected = self.is_connected()
         return {
-            'is_connected': nx.is_connected(G),
+            'is_connected': connected,
             'num_components': nx.number_connected_components(G),
-            'diameter': nx.diameter(G) if nx.is_connected(G) else None,
+            'diameter': nx.diameter(G) if connected else None,
             'average_clustering': nx.average_clustering(G)
         }
 
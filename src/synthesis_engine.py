@@ -1,37 +1,85 @@
 # src/synthesis_engine.py
 import heapq
 import json
-import copy
+import logging
 import os
-from typing import List, Dict, Any, Optional, Set, Tuple
+import functools
+import numpy as np
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable, Iterable
 from .mechanism_graph import MechanismGraph
-from .ef_validator import validate_ef_satisfaction, check_all_efs_satisfied
+from .ef_validator import validate_ef_satisfaction, check_all_efs_satisfied, validator_metadata, _triu_idx
 from .synthesis_visualizer import SynthesisVisualizer
 
+logger = logging.getLogger(__name__)
+
+class NameBits:
+    """Assigns each name of a small fixed set (EF IDs, EF types) one bit, in sorted name order."""
+    
+    def __init__(self, names: Iterable[str]):
+        self.names = tuple(sorted(set(names)))
+        self.bit = {name: 1 << i for i, name in enumerate(self.names)}
+        self.all = (1 << len(self.names)) - 1
+    
+    def mask(self, names: Iterable[str]) -> int:
+        """Bitmask with the bits of the given names set."""
+        mask = 0
+        for name in names:
+            mask |= self.bit[name]
+        return mask
+    
+    def decode(self, mask: int) -> List[str]:
+        """Names whose bits are set in mask, in sorted order."""
+        return [name for i, name in enumerate(self.names) if mask >> i & 1]
+    
+    def first(self, mask: int) -> str:
+        """Smallest name whose bit is set in mask (mask must be non-zero)."""
+        return self.names[(mask & -mask).bit_length() - 1]
+
+
 class SearchNode:
     """Represents a state in the A* search space."""
     
     def __init__(
         self, 
         graph: MechanismGraph, 
-        satisfied_efs: Set[str], 
+        satisfied_efs: int, 
         path: Optional[List[str]] = None,
-        satisfied_ef_types: Optional[Set[str]] = None
+        satisfied_ef_types: int = 0,
+        dof: Optional[int] = None,
+        dsu: Optional[Tuple[np.ndarray, np.ndarray, int]] = None,
+        ef_bits: Optional[NameBits] = None,
+        type_bits: Optional[NameBits] = None
     ):
         """
         Initialize a search node.
         
         Args:
             graph: The current mechanism graph
-            satisfied_efs: Set of satisfied EF IDs
+            satisfied_efs: Bitmask of satisfied EF IDs (bits from ef_bits)
             path: List of rule IDs applied to reach this state
-            satisfied_ef_types: Set of satisfied EF types (e.g., {'Type-1.1', 'Type-2'})
+            satisfied_ef_types: Bitmask of satisfied EF types (bits from type_bits)
+            dof: Known DOF of graph (computed if omitted)
+            dsu: Union-find state (parent, rank, num_components) of graph's
+                 elements (built from the joints if omitted)
+            ef_bits: EF ID bit assignment, used to name the satisfied EFs
+            type_bits: EF type bit assignment, used to name the satisfied types
         """
         self.graph = graph
-        self.satisfied_efs = set(satisfied_efs)
+        self.satisfied_efs = satisfied_efs
         self.path = path if path else []
         # Track which EF types are satisfied (for dynamic rule matching)
-        self.satisfied_ef_types = set(satisfied_ef_types) if satisfied_ef_types else set()
+        self.satisfied_ef_types = satisfied_ef_types
+        self.ef_bits = ef_bits
+        self.type_bits = type_bits
+        self.dof = graph.calculate_dof() if dof is None else dof
+        if dsu is None:
+            dsu = _dsu_from_graph(graph)
+        self.dsu_parent, self.dsu_rank, self.num_components = dsu
+
+    @property
+    def connected(self) -> bool:
+        """Whether all elements are joined into one component."""
+        return self.num_components == 1
 
     def __lt__(self, other):
         """For heapq comparison - this is a placeholder since priority is handled externally."""
@@ -39,26 +87,176 @@ class SearchNode:
 
     def get_state_tuple(self) -> Tuple:
         """Creates a hashable representation of the state for the visited set."""
-        # Convert adj matrix to a tuple of tuples to make it hashable
-        matrix_tuple = tuple(map(tuple, self.graph.adj_matrix))
-        # frozenset is a hashable, immutable set
-        efs_tuple = frozenset(self.satisfied_efs)
-        return (matrix_tuple, efs_tuple)
+        # The raw matrix bytes are hashable and cheap to build (one copy, no per-row tuples);
+        # all graphs in one search share a shape and dtype, so equal bytes mean equal matrices
+        matrix_key = self.graph.adj_matrix.tobytes()
+        return (matrix_key, self.satisfied_efs)
+
+    def satisfied_ef_ids(self) -> List[str]:
+        """Satisfied EF IDs, in sorted order."""
+        return self.ef_bits.decode(self.satisfied_efs)
+
+    def satisfied_type_names(self) -> List[str]:
+        """Satisfied EF types, in sorted order."""
+        return self.type_bits.decode(self.satisfied_ef_types)
 
     def __str__(self) -> str:
         """String representation for debugging."""
-        return f"SearchNode(satisfied_efs={self.satisfied_efs}, types={self.satisfied_ef_types}, path={self.path})"
+        efs = self.satisfied_ef_ids() if self.ef_bits else bin(self.satisfied_efs)
+        types = self.satisfied_type_names() if self.type_bits else bin(self.satisfied_ef_types)
+        return f"SearchNode(satisfied_efs={efs}, types={types}, path={self.path})"
+
+def _dsu_find(dsu_parent: np.ndarray, x: int) -> int:
+    """Root of x's component, halving the path on the way up."""
+    while dsu_parent[x] != x:
+        dsu_parent[x] = dsu_parent[dsu_parent[x]]
+        x = dsu_parent[x]
+    return int(x)
+
+def _dsu_union(dsu_parent: np.ndarray, dsu_rank: np.ndarray, a: int, b: int) -> bool:
+    """Merge the components of a and b (union by rank); False if already joined."""
+    ra, rb = _dsu_find(dsu_parent, a), _dsu_find(dsu_parent, b)
+    if ra == rb:
+        return False
+    if dsu_rank[ra] < dsu_rank[rb]:
+        ra, rb = rb, ra
+    dsu_parent[rb] = ra
+    if dsu_rank[ra] == dsu_rank[rb]:
+        dsu_rank[ra] += 1
+    return True
 
+def _dsu_from_graph(graph: MechanismGraph) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Union-find state (parent, rank, num_components) over the graph's joints."""
+    n = graph.num_elements
+    dsu_parent = np.arange(n)
+    dsu_rank = np.zeros(n, dtype=int)
+    num_components = n
+    for i, j in zip(*np.nonzero(np.triu(graph.adj_matrix, k=1))):
+        num_components -= _dsu_union(dsu_parent, dsu_rank, int(i), int(j))
+    return dsu_parent, dsu_rank, num_components
+
+# DOF removed by one joint of each code in Grubler's formula: F = 3(n0 - 1) - sum(cost)
+# (a fixed joint merges two elements: 3; lower pairs: 2; higher pair X: 1; no joint: 0)
+_JOINT_DOF_COST = {0: 0, -1: 3, 1: 2, 3: 2, 5: 2, 6: 2, 7: 2, 2: 1}
+
+
+JointEdit = Tuple[int, int, int, int]  # (i, j, previous_code, new_code) of the joint a rule sets or changes
+
+def _successor_state(
+    parent: SearchNode,
+    edit: Optional[JointEdit]
+) -> Tuple[int, Tuple[np.ndarray, np.ndarray, int]]:
+    """Derive a successor's DOF and union-find state from its parent and the planned joint edit."""
+    dsu = (parent.dsu_parent, parent.dsu_rank, parent.num_components)
+    if edit is None:
+        return parent.dof, dsu
+    i, j, old_code, new_code = edit
+    dof = parent.dof + _JOINT_DOF_COST[old_code] - _JOINT_DOF_COST[new_code]
+    # Rules only add or upgrade joints; only a new joint can merge components
+    if old_code == 0 and not parent.connected:
+        dsu_parent, dsu_rank = parent.dsu_parent.copy(), parent.dsu_rank.copy()
+        merged = _dsu_union(dsu_parent, dsu_rank, i, j)
+        dsu = (dsu_parent, dsu_rank, parent.num_components - merged)
+    return dof, dsu
+
+_RULES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'knowledge_base', 'transformation_rules.json'
+)
+
+@functools.lru_cache(maxsize=1)
 def _load_transformation_rules() -> List[Dict[str, Any]]:
-    """Load transformation rules from the knowledge base."""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    project_root = os.path.dirname(script_dir)
-    rules_path = os.path.join(project_root, 'knowledge_base', 'transformation_rules.json')
-    
-    with open(rules_path, 'r') as f:
+    """Load transformation rules from the knowledge base (parsed once per process; treat as read-only)."""
+    with open(_RULES_PATH, 'r') as f:
         return json.load(f)['rules']
 
-def _apply_rule_to_graph(graph: MechanismGraph, rule: Dict[str, Any]) -> MechanismGraph:
+@functools.lru_cache(maxsize=1)
+def _rule_index() -> Dict[Tuple[str, str], List[Dict[str, Any]]]:
+    """Rules grouped by (existing_ef, required_ef), in file order (built once; treat as read-only)."""
+    rule_index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for rule in _load_transformation_rules():
+        applies_to = rule['applies_to']
+        rule_index.setdefault((applies_to['existing_ef'], applies_to['required_ef']), []).append(rule)
+    return rule_index
+
+def _add_first_free_joint(graph: MechanismGraph, joint_type: str, pairs: Tuple[Tuple[int, int], ...]) -> Optional[JointEdit]:
+    """Plan joint_type at the first (i, j) of pairs that exists in the graph and has no joint yet."""
+    adj = graph.adj_matrix
+    for i, j in pairs:
+        if j < graph.num_elements and adj[i, j] == 0:
+            return (i, j, 0, MechanismGraph.JOINT_MAP[joint_type])
+    return None
+
+
+def _upgrade_table(upgrades: Dict[int, int]) -> np.ndarray:
+    """Lookup array mapping joint code + 1 (codes run from -1 to 7) to its upgraded code, 0 if none."""
+    table = np.zeros(9, dtype=int)
+    for old_code, new_code in upgrades.items():
+        table[old_code + 1] = new_code
+    return table
+
+
+def _upgrade_first_joint(graph: MechanismGraph, upgrades: np.ndarray) -> Optional[JointEdit]:
+    """Plan the upgrade of the first joint (row-major, upper triangle) that has an entry in the upgrades table."""
+    rows, cols = _triu_idx(graph.num_elements)
+    upper = graph.adj_matrix[rows, cols]
+    hits = np.flatnonzero(upgrades[upper + 1])
+    if not hits.size:
+        return None
+    k = hits[0]
+    old_code = int(upper[k])
+    return (int(rows[k]), int(cols[k]), old_code, int(upgrades[old_code + 1]))
+
+
+_STOPPER_UPGRADES = _upgrade_table({3: 5, 6: 7})
+
+
+def _add_stopper(graph: MechanismGraph) -> Optional[JointEdit]:
+    # Prismatic -> Limited (LP), Spring -> Limited Spring (LSP); otherwise fix elements 0-1
+    edit = _upgrade_first_joint(graph, _STOPPER_UPGRADES)
+    if edit is None:
+        edit = _add_first_free_joint(graph, 'F', ((0, 1),))
+    return edit
+
+
+# Operation -> planner that reads the graph (without changing it) and returns the JointEdit
+# the operation would make (None if it leaves the graph unchanged).
+# Joint-adding operations try their (i, j) pairs in order.
+_OPERATION_DISPATCH: Dict[str, Callable[[MechanismGraph], Optional[JointEdit]]] = {
+    'ADD_REVOLUTE_JOINT': functools.partial(_add_first_free_joint, joint_type='R', pairs=((0, 1),)),
+    'ADD_PRISMATIC_JOINT': functools.partial(_add_first_free_joint, joint_type='P', pairs=((0, 2), (0, 1))),
+    # Variable constraint joint (simplified as a revolute for now)
+    'ADD_VARIABLE_JOINT': functools.partial(_add_first_free_joint, joint_type='R', pairs=((1, 2), (0, 1))),
+    'ADD_STOPPER': _add_stopper,
+    # Prismatic -> Spring (SP), Limited -> Limited Spring (LSP)
+    'ADD_RETURN_SPRING': functools.partial(_upgrade_first_joint, upgrades=_upgrade_table({3: 6, 5: 7})),
+    # Damping element - simplified as adding a prismatic joint
+    'ADD_DAMPER': functools.partial(_add_first_free_joint, joint_type='P', pairs=((2, 3), (1, 2), (0, 1))),
+    # Over-center mechanism - simplified as adding a revolute joint
+    'ADD_OVER_CENTER': functools.partial(_add_first_free_joint, joint_type='R', pairs=((0, 1),)),
+    # Cam mechanism - simplified as adding a higher pair joint
+    'ADD_CAM_MECHANISM': functools.partial(_add_first_free_joint, joint_type='X', pairs=((1, 2), (0, 1))),
+    # Gear train - simplified as adding a higher pair joint
+    'ADD_GEAR_TRAIN': functools.partial(_add_first_free_joint, joint_type='X', pairs=((0, 2), (0, 1))),
+    # Adding a link would require more elements; for simplicity join existing elements
+    'ADD_LINK': functools.partial(_add_first_free_joint, joint_type='R', pairs=((0, 1),)),
+}
+
+
+def _plan_rule(graph: MechanismGraph, rule: Dict[str, Any]) -> Optional[JointEdit]:
+    """The single joint edit a transformation rule would make to graph, or None."""
+    planner = _OPERATION_DISPATCH.get(rule.get('suggested_operation', ''))
+    return planner(graph) if planner is not None else None
+
+def _apply_edit(graph: MechanismGraph, edit: Optional[JointEdit]) -> MechanismGraph:
+    """Copy of graph with the planned joint edit made."""
+    new_graph = graph.clone()
+    if edit is not None:
+        i, j, _, new_code = edit
+        new_graph.adj_matrix[i, j] = new_graph.adj_matrix[j, i] = new_code
+    return new_graph
+
+def _apply_rule_to_graph(graph: MechanismGraph, rule: Dict[str, Any]) -> Tuple[MechanismGraph, Optional[JointEdit]]:
     """
     Apply a transformation rule to a mechanism graph.
     This is a simplified implementation - in a real system, this would be more sophisticated.
@@ -68,113 +266,17 @@ def _apply_rule_to_graph(graph: MechanismGraph, rule: Dict[str, Any]) -> Mechani
         rule: The transformation rule to apply
         
     Returns:
-        Modified mechanism graph
+        (modified graph, edit) where edit is the (i, j, previous_code, new_code) of the one
+        joint the rule set or changed, or None if the graph is unchanged
     """
-    new_graph = copy.deepcopy(graph)
-    num_elements = new_graph.num_elements
-    
-    # Get the operation type
-    operation = rule.get('suggested_operation', '')
-    
-    if operation == 'ADD_REVOLUTE_JOINT':
-        # Add a revolute joint between two elements
-        # For simplicity, add between elements 0 and 1 if not already connected
-        if num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'R')
-    
-    elif operation == 'ADD_PRISMATIC_JOINT':
-        # Add a prismatic joint between two elements
-        if num_elements > 2 and new_graph.adj_matrix[0, 2] == 0:
-            new_graph.add_joint(0, 2, 'P')
-        elif num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'P')
-    
-    elif operation == 'ADD_VARIABLE_JOINT':
-        # Add a variable constraint joint (simplified as a revolute for now)
-        if num_elements > 2 and new_graph.adj_matrix[1, 2] == 0:
-            new_graph.add_joint(1, 2, 'R')
-        elif num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'R')
-    
-    elif operation == 'ADD_STOPPER':
-        modified = False
-        for i in range(num_elements):
-            for j in range(i + 1, num_elements):
-                curr = new_graph.adj_matrix[i, j]
-                if curr == 3:  # Prismatic -> Limited
-                    new_graph.adj_matrix[i, j] = 5  # LP
-                    new_graph.adj_matrix[j, i] = 5
-                    modified = True
-                    break
-                elif curr == 6:  # Spring -> Limited Spring
-                    new_graph.adj_matrix[i, j] = 7  # LSP
-                    new_graph.adj_matrix[j, i] = 7
-                    modified = True
-                    break
-            if modified:
-                break
-        
-        if not modified and num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'F')
-    
-    elif operation == 'ADD_RETURN_SPRING':
-        modified = False
-        for i in range(num_elements):
-            for j in range(i + 1, num_elements):
-                curr = new_graph.adj_matrix[i, j]
-                if curr == 3:  # Prismatic -> Spring
-                    new_graph.adj_matrix[i, j] = 6  # SP
-                    new_graph.adj_matrix[j, i] = 6
-                    modified = True
-                    break
-                elif curr == 5:  # Limited -> Limited Spring
-                    new_graph.adj_matrix[i, j] = 7  # LSP
-                    new_graph.adj_matrix[j, i] = 7
-                    modified = True
-                    break
-            if modified:
-                break
-    
-    elif operation == 'ADD_DAMPER':
-        # Add a damping element - simplified as adding a prismatic joint
-        if num_elements > 3 and new_graph.adj_matrix[2, 3] == 0:
-            new_graph.add_joint(2, 3, 'P')
-        elif num_elements > 2 and new_graph.adj_matrix[1, 2] == 0:
-            new_graph.add_joint(1, 2, 'P')
-        elif num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'P')
-    
-    elif operation == 'ADD_OVER_CENTER':
-        # Add over-center mechanism - simplified as adding a revolute joint
-        if num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'R')
-    
-    elif operation == 'ADD_CAM_MECHANISM':
-        # Add cam mechanism - simplified as adding a higher pair joint
-        if num_elements > 2 and new_graph.adj_matrix[1, 2] == 0:
-            new_graph.add_joint(1, 2, 'X')
-        elif num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'X')
-    
-    elif operation == 'ADD_GEAR_TRAIN':
-        # Add gear train - simplified as adding a higher pair joint
-        if num_elements > 2 and new_graph.adj_matrix[0, 2] == 0:
-            new_graph.add_joint(0, 2, 'X')
-        elif num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'X')
-    
-    elif operation == 'ADD_LINK':
-        # Add a link - this would require increasing the number of elements
-        # For simplicity, we'll just add a joint between existing elements
-        if num_elements > 1 and new_graph.adj_matrix[0, 1] == 0:
-            new_graph.add_joint(0, 1, 'R')
-    
-    return new_graph
+    edit = _plan_rule(graph, rule)
+    return _apply_edit(graph, edit), edit
 
 def run_synthesis(
     task: Dict[str, Any], 
     initial_solution: Dict[str, Any],
-    enable_visualization: bool = True
+    enable_visualization: bool = True,
+    disp_skip: int = 1
 ) -> Optional[SearchNode]:
     """
     Uses A* search to find a sequence of modifications to satisfy all EFs.
@@ -184,30 +286,53 @@ def run_synthesis(
         task: The design task dictionary
         initial_solution: The initial solution to start from
         enable_visualization: Whether to save step-by-step visualizations
+        disp_skip: Render only every Nth intermediate step image
         
     Returns:
         SearchNode representing the final solution, or None if no solution found
     """
     print(f"\n[PHASE 2.2] Starting A* Synthesis for '{initial_solution['name']}'...")
     
-    rules = _load_transformation_rules()
-    all_ef_ids = {ef['ef_id'] for ef in task['elemental_functions']}
+    rule_index = _rule_index()
+    # Validator lookups are built once per run and passed explicitly (never stored on the task)
+    validator_meta = validator_metadata(task)
+    ef_by_id = validator_meta['ef_by_id']
+    all_ef_ids = set(ef_by_id)
     # Initialize visualizer
     visualizer = None
     if enable_visualization:
         task_name = task.get('task_name', 'Unknown_Task')
-        visualizer = SynthesisVisualizer(task_name, initial_solution['name'])
-        # Save initial state
-        first_ef = next((ef for ef in task['elemental_functions'] if ef['ef_id'] == 'EF1'), None)
-        first_ef_type = first_ef.get('type', 'Unknown') if first_ef else 'Unknown'
-        visualizer.save_step(
-            initial_solution['graph'],
-            iteration=0,
-            satisfied_efs=['EF1'],
-            description=f"Initial: {first_ef_type}",
-            task=task
-        )
-    
+        visualizer = SynthesisVisualizer(task_name, initial_solution['name'], disp_skip=disp_skip)
+    
+    try:
+        if visualizer:
+            # Save initial state
+            first_ef = next((ef for ef in task['elemental_functions'] if ef['ef_id'] == 'EF1'), None)
+            first_ef_type = first_ef.get('type', 'Unknown') if first_ef else 'Unknown'
+            visualizer.save_step(
+                initial_solution['graph'],
+                iteration=0,
+                satisfied_efs=['EF1'],
+                description=f"Initial: {first_ef_type}",
+                task=task
+            )
+        return _a_star_search(task, initial_solution, rule_index, ef_by_id, all_ef_ids, validator_meta, visualizer)
+    finally:
+        if visualizer:
+            # Step images render in the background; wait for them before returning
+            # (close() reports failed renders instead of raising over the search result)
+            visualizer.close()
+
+def _a_star_search(
+    task: Dict[str, Any],
+    initial_solution: Dict[str, Any],
+    rule_index: Dict[Tuple[str, str], List[Dict[str, Any]]],
+    ef_by_id: Dict[str, Dict[str, Any]],
+    all_ef_ids: Set[str],
+    validator_meta: Dict[str, Any],
+    visualizer: Optional[SynthesisVisualizer]
+) -> Optional[SearchNode]:
+    """The A* loop of run_synthesis, starting from the initial solution with EF1 satisfied."""
     # Find first EF and its type
     first_ef = next((ef for ef in task['elemental_functions'] if ef['ef_id'] == 'EF1'), None)
     if not first_ef:
@@ -216,16 +341,22 @@ def run_synthesis(
     
     first_ef_type = first_ef.get('type', 'Type-1.1')
     
+    # Satisfied EFs and EF types are tracked as bitmasks over these assignments
+    ef_bits = NameBits(all_ef_ids)
+    type_bits = NameBits([first_ef_type] + [ef['type'] for ef in ef_by_id.values() if 'type' in ef])
+    
     # Validate initial solution satisfies EF1
-    is_valid, reason = validate_ef_satisfaction(initial_solution['graph'], first_ef, task)
+    is_valid, reason = validate_ef_satisfaction(initial_solution['graph'], first_ef, task, validator_meta)
     if not is_valid:
         print(f"Warning: Initial solution may not satisfy EF1: {reason}")
     
     # Start with the first EF satisfied (EF1)
     start_node = SearchNode(
         initial_solution['graph'], 
-        satisfied_efs={'EF1'},
-        satisfied_ef_types={first_ef_type}
+        satisfied_efs=ef_bits.bit['EF1'],
+        satisfied_ef_types=type_bits.bit[first_ef_type],
+        ef_bits=ef_bits,
+        type_bits=type_bits
     )
     
     # Priority Queue (Open List): (priority, cost, node)
@@ -235,9 +366,14 @@ def run_synthesis(
     
     # Closed List: Stores hashable state tuples of visited nodes
     visited = {start_node.get_state_tuple()}
+    # EF-validation failures keyed by (graph state, EF ID) -> reason. Validation depends only
+    # on the graph and the EF, so a recurring (graph, EF) pair is pruned at any depth.
+    failed_states: Dict[Tuple, str] = {}
     
     iteration = 0
     max_iterations = 100  # Prevent infinite loops
+    # Per-successor traces go to the DEBUG log; checked once so they cost nothing when disabled
+    trace = logger.isEnabledFor(logging.DEBUG)
     
     while open_list and iteration < max_iterations:
         iteration += 1
@@ -248,8 +384,10 @@ def run_synthesis(
         # GOAL CHECK with validation
         all_satisfied, unsatisfied_list = check_all_efs_satisfied(
             current_node.graph,
-            current_node.satisfied_efs,
-            task
+            set(current_node.satisfied_ef_ids()),
+            task,
+            ef_by_id,
+            validator_meta
         )
         if all_satisfied:
             print(" -> GOAL REACHED! Found a valid modification path.")
@@ -258,103 +396,117 @@ def run_synthesis(
                 visualizer.save_step(
                     current_node.graph,
                     iteration=iteration,
-                    satisfied_efs=list(current_node.satisfied_efs),
+                    satisfied_efs=current_node.satisfied_ef_ids(),
                     description="FINAL SOLUTION",
                     task=task
                 )
             return current_node
         
         # --- GENERATE SUCCESSORS ---
-        unsatisfied_efs = all_ef_ids - current_node.satisfied_efs
+        unsatisfied_efs = ef_bits.all & ~current_node.satisfied_efs
         if not unsatisfied_efs:
             continue
         
         # Pick the next EF to solve (simple sequential order for now)
-        next_ef_id = sorted(list(unsatisfied_efs))[0]
-        next_ef = next(ef for ef in task['elemental_functions'] if ef['ef_id'] == next_ef_id)
+        next_ef_id = ef_bits.first(unsatisfied_efs)
+        next_ef = ef_by_id[next_ef_id]
         required_ef_type = next_ef['type']
         
         print(f" -> Next EF to satisfy: {next_ef_id} ({next_ef['description']}, Type: {required_ef_type})")
         
         # DYNAMIC RULE MATCHING: Try rules from any satisfied EF type
-        applicable_rules = []
-        for existing_ef_type in current_node.satisfied_ef_types:
-            matching_rules = [
-                r for r in rules 
-                if (r['applies_to']['existing_ef'] == existing_ef_type and 
-                    r['applies_to']['required_ef'] == required_ef_type)
-            ]
-            applicable_rules.extend(matching_rules)
+        # (keyed by rule_id so duplicates keep their first occurrence)
+        satisfied_types = current_node.satisfied_type_names()
+        matching_rules: Dict[str, Dict[str, Any]] = {}
+        for existing_ef_type in satisfied_types:
+            for rule in rule_index.get((existing_ef_type, required_ef_type), ()):
+                matching_rules.setdefault(rule['rule_id'], rule)
+        applicable_rules = list(matching_rules.values())
         
-        # Remove duplicates (same rule_id)
-        seen_rule_ids = set()
-        unique_rules = []
-        for rule in applicable_rules:
-            if rule['rule_id'] not in seen_rule_ids:
-                seen_rule_ids.add(rule['rule_id'])
-                unique_rules.append(rule)
-        applicable_rules = unique_rules
-        
-        print(f" -> Found {len(applicable_rules)} applicable rules (from types: {current_node.satisfied_ef_types})")
+        print(f" -> Found {len(applicable_rules)} applicable rules (from types: {satisfied_types})")
         
         if not applicable_rules:
             print(f" -> Dead end: No rule found for transition to {required_ef_type}")
             continue
         
         for rule in applicable_rules:
-            print(f"   -> Applying rule '{rule['rule_id']}': {rule['description']}")
+            if trace:
+                logger.debug("   -> Applying rule '%s': %s", rule['rule_id'], rule['description'])
             
-            # Create a new state by applying the rule
-            new_graph = _apply_rule_to_graph(current_node.graph, rule)
+            # Plan the rule's edit and derive the new state's DOF/connectivity from it;
+            # the graph is only copied once those cheap checks pass
+            edit = _plan_rule(current_node.graph, rule)
+            new_dof, new_dsu = _successor_state(current_node, edit)
             
             # Check if the new graph is valid (connected and reasonable DOF)
-            if not new_graph.is_connected():
-                print(f"     -> Skipping: Graph not connected after applying {rule['rule_id']}")
+            if new_dsu[2] != 1:  # more than one component
+                if trace:
+                    logger.debug("     -> Skipping: Graph not connected after applying %s", rule['rule_id'])
                 continue
             
-            new_dof = new_graph.calculate_dof()
             if new_dof < 0 or new_dof > 3:  # Reasonable DOF range
-                print(f"     -> Skipping: Invalid DOF ({new_dof}) after applying {rule['rule_id']}")
+                if trace:
+                    logger.debug("     -> Skipping: Invalid DOF (%d) after applying %s", new_dof, rule['rule_id'])
                 continue
             
-            # VALIDATE EF SATISFACTION
-            is_valid, validation_reason = validate_ef_satisfaction(new_graph, next_ef, task)
+            new_graph = _apply_edit(current_node.graph, edit)
+            
+            # VALIDATE EF SATISFACTION (reusing the verdict if this graph already failed this EF)
+            failure_key = (new_graph.adj_matrix.tobytes(), next_ef_id)
+            validation_reason = failed_states.get(failure_key)
+            if validation_reason is None:
+                is_valid, validation_reason = validate_ef_satisfaction(new_graph, next_ef, task, validator_meta)
+                if not is_valid:
+                    failed_states[failure_key] = validation_reason
+            else:
+                is_valid = False
             if not is_valid:
-                print(f"     -> Skipping: EF validation failed - {validation_reason}")
+                if trace:
+                    logger.debug("     -> Skipping: EF validation failed - %s", validation_reason)
+                new_graph.release()
                 continue
             
             # Update satisfied EFs and types
-            new_satisfied_efs = current_node.satisfied_efs.union({next_ef_id})
-            new_satisfied_ef_types = current_node.satisfied_ef_types.union({required_ef_type})
+            new_satisfied_efs = current_node.satisfied_efs | ef_bits.bit[next_ef_id]
+            new_satisfied_ef_types = current_node.satisfied_ef_types | type_bits.bit[required_ef_type]
             new_path = current_node.path + [rule['rule_id']]
             
             new_node = SearchNode(
                 new_graph, 
                 new_satisfied_efs, 
                 new_path,
-                new_satisfied_ef_types
+                new_satisfied_ef_types,
+                dof=new_dof,
+                dsu=new_dsu,
+                ef_bits=ef_bits,
+                type_bits=type_bits
             )
-            if new_node.get_state_tuple() in visited:
-                print(f"     -> Skipping: State already visited")
+            new_state = new_node.get_state_tuple()
+            if new_state in visited:
+                if trace:
+                    logger.debug("     -> Skipping: State already visited")
+                new_graph.release()
                 continue
             
-            visited.add(new_node.get_state_tuple())
+            visited.add(new_state)
             # Save visualization step
             if visualizer:
                 visualizer.save_step(
                     new_graph,
                     iteration=iteration,
                     rule_applied=rule['rule_id'],
-                    satisfied_efs=list(new_satisfied_efs),
+                    satisfied_efs=ef_bits.decode(new_satisfied_efs),
                     description=f"Applied {rule['rule_id']} to satisfy {next_ef_id}"
                 )
             
             new_cost = cost + rule.get('cost', 1)
-            heuristic = len(all_ef_ids) - len(new_satisfied_efs)
+            heuristic = len(all_ef_ids) - bin(new_satisfied_efs).count('1')
             new_priority = new_cost + heuristic
             
             heapq.heappush(open_list, (new_priority, new_cost, new_node))
-            print(f"     -> Added to queue: Priority={new_priority}, Cost={new_cost}, Heuristic={heuristic}, Validated: ✓")
+            if trace:
+                logger.debug("     -> Added to queue: Priority=%s, Cost=%s, Heuristic=%s, Validated: ✓",
+                             new_priority, new_cost, heuristic)
     
     if iteration >= max_iterations:
         print(f" -> A* Search stopped after {max_iterations} iterations (max limit reached)")
@@ -5,14 +5,18 @@ Saves mechanism graphs at each A* iteration for analysis.
 """
 
 import os
+import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Optional, List
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 from .mechanism_graph import MechanismGraph
 
 
 class SynthesisVisualizer:
     """Manages step-by-step visualization during synthesis."""
     
-    def __init__(self, task_name: str, base_mechanism_name: str, output_dir: str = "output"):
+    def __init__(self, task_name: str, base_mechanism_name: str, output_dir: str = "output", disp_skip: int = 1):
         """
         Initialize the visualizer for a synthesis run.
         
@@ -20,6 +24,8 @@ class SynthesisVisualizer:
             task_name: Name of the design task
             base_mechanism_name: Name of the initial mechanism
             output_dir: Base output directory
+            disp_skip: Render only every Nth intermediate (rule) step; the initial
+                and final states are always rendered and every step is still logged
         """
         self.task_name = task_name
         self.base_mechanism_name = base_mechanism_name
@@ -31,17 +37,26 @@ class SynthesisVisualizer:
             base_mechanism_name.replace(" ", "_").replace("/", "_")
         )
         self.step_count = 0
+        self._disp_skip = max(1, int(disp_skip))
+        # Step images render on one background thread so the search is not blocked on them
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._pending: List[Future] = []
+        # One private Agg figure, cleared and reused for every step (only the worker draws on it;
+        # pyplot's global state is not thread-safe, so it is not used here)
+        self._fig = Figure(figsize=(10, 8))
+        FigureCanvasAgg(self._fig)
+        self._ax = self._fig.add_subplot()
         
         # Create directory structure
         os.makedirs(self.steps_dir, exist_ok=True)
-        # Steps metadata
-        self.steps_info_path = os.path.join(self.steps_dir, 'steps_info.json')
+        # Steps metadata (JSON lines: one record appended per step)
+        self.steps_info_path = os.path.join(self.steps_dir, 'steps_info.jsonl')
         self.steps_info = []
         # Load existing if present
         if os.path.exists(self.steps_info_path):
             try:
                 with open(self.steps_info_path, 'r', encoding='utf-8') as f:
-                    self.steps_info = json.load(f)
+                    self.steps_info = [json.loads(line) for line in f if line.strip()]
             except Exception:
                 self.steps_info = []
     
@@ -53,7 +68,7 @@ class SynthesisVisualizer:
         satisfied_efs: Optional[List[str]] = None,
         description: Optional[str] = None
         , task: Optional[dict] = None
-    ) -> str:
+    ) -> Optional[str]:
         """
         Save a visualization of the current synthesis step.
         
@@ -65,7 +80,8 @@ class SynthesisVisualizer:
             description: Optional description text
             
         Returns:
-            Path to saved image file
+            Path to the image file (written in the background; call close() to wait for it),
+            or None if the step was skipped by disp_skip
         """
         self.step_count += 1
         
@@ -76,6 +92,8 @@ class SynthesisVisualizer:
             filename = f"step_{iteration:03d}_initial.png"
         
         filepath = os.path.join(self.steps_dir, filename)
+        # Intermediate steps are throttled to every disp_skip-th one; only the metadata is kept
+        render = not rule_applied or self.step_count % self._disp_skip == 0
         
         # Build title with context
         title_parts = [f"Step {iteration}: {self.base_mechanism_name}"]
@@ -126,25 +144,47 @@ class SynthesisVisualizer:
                                 # direction for motion arrow: positive x
                                 force_directions[idx] = (0.6, 0)
 
-        # Save visualization with highlights and force directions
-        graph.visualize(title=title, save_path=filepath, highlight_nodes=highlight_nodes, force_directions=force_directions)
+        # Queue the visualization with highlights and force directions on a snapshot of the graph
+        if render:
+            self._pending.append(self._executor.submit(
+                self._render_step, graph.clone(), title, filepath, highlight_nodes, force_directions
+            ))
         
         # Record metadata
         step_meta = {
             'iteration': iteration,
-            'filename': filename,
+            'filename': filename if render else None,
             'rule_applied': rule_applied,
             'satisfied_efs': satisfied_efs or [],
             'description': description or ''
         }
         self.steps_info.append(step_meta)
         try:
-            with open(self.steps_info_path, 'w', encoding='utf-8') as f:
-                json.dump(self.steps_info, f, indent=2)
+            with open(self.steps_info_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(step_meta) + '\n')
         except Exception:
             pass
         
-        return filepath
+        return filepath if render else None
+    
+    def _render_step(self, graph: MechanismGraph, title: str, filepath: str, highlight_nodes: List[int], force_directions: dict) -> None:
+        """Render one step image on the shared figure (runs on the worker thread)."""
+        self._ax.clear()
+        graph.draw(self._ax, title=title, highlight_nodes=highlight_nodes, force_directions=force_directions)
+        self._fig.savefig(filepath, dpi=300, bbox_inches='tight')
+        print(f"Graph saved to {filepath}")
+    
+    def close(self) -> None:
+        """Wait for all queued step images and stop the worker; failed renders are reported, not raised."""
+        pending, self._pending = self._pending, []
+        try:
+            for future in pending:
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Warning: Failed to save synthesis step image: {e}")
+        finally:
+            self._executor.shutdown(wait=True)
     
     def get_steps_directory(self) -> str:
         """Get the directory where step images are saved."""
@@ -0,0 +1,21 @@
+# src/task_files.py
+"""
+Task file discovery shared by the CLI and the benchmark
+"""
+
+import os
+import functools
+from typing import List, Tuple
+
+
+@functools.lru_cache(maxsize=4)
+def _cached_listdir(dir_path: str, mtime_ns: int) -> Tuple[str, ...]:
+    """Sorted file names in a directory; mtime_ns invalidates the cache when it changes."""
+    with os.scandir(dir_path) as entries:
+        return tuple(sorted(entry.name for entry in entries if entry.is_file()))
+
+
+def list_task_files(tasks_dir: str) -> List[str]:
+    """Sorted names of the task JSON files in tasks_dir."""
+    names = _cached_listdir(tasks_dir, os.stat(tasks_dir).st_mtime_ns)
+    return [f for f in names if f.endswith('.json')]
@@ -1,17 +1,73 @@
+import functools
+import io
+import multiprocessing
 import os
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from types import MappingProxyType, SimpleNamespace
 from typing import List
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib as mpl
 import matplotlib.patches as patches
 from matplotlib.patches import FancyArrowPatch
-from matplotlib.animation import FuncAnimation, PillowWriter
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.font_manager import FontProperties
+from matplotlib.collections import PolyCollection
+from matplotlib.lines import Line2D
+from matplotlib.text import Text
+from PIL import Image
 from .kinematic_simulation import KinematicSimulator
+from .mechanism_graph import _layout_for
 
 # Animation defaults
 DEFAULT_NUM_FRAMES = 120
 DEFAULT_FPS = 12
 PAUSE_FRAMES_PER_RULE = 40
 FINAL_CYCLES = 2
+ANIMATION_DPI = 96 # Rasterization DPI of animation frames (and of the preview PNG)
+SCHEMATIC_DPI = 150 # Schematic and NetworkX graph PNGs
+
+# Bits of the rule elements drawn in an animation phase (see _rule_mask)
+RULE_STOPPER = 1   # R3.1
+RULE_SPRING = 2    # R4.1
+RULE_VAR_JOINT = 4 # R2.1
+
+
+def _rule_mask(rules: List[str]) -> int:
+    """Bitmask of the rule elements that the applied rules make visible."""
+    mask = 0
+    for rule in rules:
+        if 'R3.1' in rule: mask |= RULE_STOPPER
+        if 'R4.1' in rule: mask |= RULE_SPRING
+        if 'R2.1' in rule: mask |= RULE_VAR_JOINT
+    return mask
+
+# Schematic "Modifications:" block: shared fonts for the header, the rule lines and the
+# stopper/spring labels, and the line written for each rule (rules without a label leave
+# their line blank)
+_MODIFICATION_HEADER_FONT = FontProperties(size=10, weight='bold')
+_MODIFICATION_FONT = FontProperties(size=9)
+_MARK_LABEL_FONT = FontProperties(size=10)
+# Vertical distance between rule lines (and from the header to the first one), in data units
+_MODIFICATION_LINE_STEP = 0.4
+_RULE_LINE = {
+    'R3.1': ' - R3.1: Added Stopper',
+    'R4.1': ' - R4.1: Added Return Spring',
+}
+
+
+@functools.lru_cache(maxsize=64)
+def _modification_lines(path: tuple) -> str:
+    """Text of the Modifications block for a rule path (one line per rule)."""
+    if not path:
+        return " - None"
+    return "\n".join(_RULE_LINE.get(rule_id, "") for rule_id in path)
+
+
+# Outline of the stopper drawn for each R3.1 (x 6..6.2, y -0.15..0.35)
+_STOPPER_VERTS = ((6, -0.15), (6.2, -0.15), (6.2, 0.35), (6, 0.35))
 
 
 class Visualizer:
@@ -19,49 +75,108 @@ class Visualizer:
     Translates a MechanismGraph and modification path into a 2D schematic.
     """
 
+    # Description of each joint type (read-only, built once)
+    _JOINT_DESC = MappingProxyType({
+        'R': 'Revolute',
+        'P': 'Prismatic',
+        'X': 'Higher Pair',
+        'F': 'Fixed',
+        'LP': 'Limited Prismatic',
+        'SP': 'Spring-Loaded Prismatic',
+        'LSP': 'Limited Spring Prismatic'
+    })
+
     def __init__(self) -> None:
         if not os.path.exists('output'):
             os.makedirs('output')
         self.simulator = KinematicSimulator()
+        # Whether ffmpeg is available; looked up on the first MP4 request (see _ffmpeg_available)
+        self._have_ffmpeg = None
+        # Agg figures reused across calls, one per (figsize, dpi); see _figure()
+        self._figures = {}
 
-    def generate_animation(self, base_mechanism_name: str, filename: str, solution_node=None, num_frames: int = DEFAULT_NUM_FRAMES, fps: int = DEFAULT_FPS, pause_frames_per_rule: int = PAUSE_FRAMES_PER_RULE, final_cycles: int = FINAL_CYCLES) -> None:
+    def _figure(self, figsize, dpi=None):
+        """
+        Cleared figure of the given size with one fresh axes, reused across calls.
+        These are plain Agg figures outside pyplot, so they stay open until close().
+        """
+        fig = self._figures.get((figsize, dpi))
+        if fig is None:
+            fig = self._figures[(figsize, dpi)] = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(fig)
+        else:
+            fig.clear()
+        return fig, fig.add_subplot()
+
+    def _ffmpeg_available(self) -> bool:
+        """Whether matplotlib can find ffmpeg (checked once per Visualizer)."""
+        if self._have_ffmpeg is None:
+            from matplotlib.animation import FFMpegWriter
+            self._have_ffmpeg = FFMpegWriter.isAvailable()
+        return self._have_ffmpeg
+
+    def close(self) -> None:
+        """Release the reused figures."""
+        self._figures.clear()
+
+    @classmethod
+    def generate_animations(cls, jobs, n_workers: int = None) -> None:
+        """
+        Runs several generate_animation calls in parallel worker processes.
+        Each job is (base_mechanism_name, filename, solution_node, kwargs); every
+        worker builds its own Visualizer. Workers are spawned rather than forked,
+        since matplotlib state is not fork-safe on every platform.
+        """
+        jobs = list(jobs)
+        workers = min(n_workers or os.cpu_count() or 1, len(jobs))
+        if workers <= 1:
+            for job in jobs:
+                _animation_job(job)
+            return
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            for future in [executor.submit(_animation_job, job) for job in jobs]:
+                future.result()
+
+    def generate_animation(self, base_mechanism_name: str, filename: str, solution_node=None, num_frames: int = DEFAULT_NUM_FRAMES, fps: int = DEFAULT_FPS, pause_frames_per_rule: int = PAUSE_FRAMES_PER_RULE, final_cycles: int = FINAL_CYCLES, formats: tuple = ('gif',)) -> None:
         """
         Generates a GIF animation for the synthesized mechanism.
         Shows progressive application of rules if solution_node is provided.
+        formats selects the outputs ('gif' and/or 'mp4'; MP4 needs ffmpeg).
         """
         name = (base_mechanism_name or "").lower()
         
-        fig, ax = plt.subplots(figsize=(8, 6))
+        fig, ax = self._figure((8, 6), dpi=ANIMATION_DPI)
         ax.set_aspect('equal')
         ax.grid(True, linestyle='--', alpha=0.6)
+        # Per-frame title lives in the axes' title Text artist so it can be blitted
+        title_text = ax.set_title("")
         
-        # Get base simulation frames
-        sim_frames = []
+        # Get base simulation trace (one array per quantity, indexed by pose)
         if "slider-crank" in name:
-            sim_frames = self.simulator.simulate_slider_crank(num_frames=num_frames)
+            trace = self.simulator.simulate_slider_crank(num_frames=num_frames)
         elif "rack" in name and "pinion" in name:
-            sim_frames = self.simulator.simulate_rack_pinion(num_frames=num_frames)
+            trace = self.simulator.simulate_rack_pinion(num_frames=num_frames)
         elif "cam" in name and "follower" in name:
-            sim_frames = self.simulator.simulate_cam_follower(num_frames=num_frames)
+            trace = self.simulator.simulate_cam_follower(num_frames=num_frames)
         else:
             print(f"Animation not supported for {base_mechanism_name}")
-            plt.close(fig)
             return
+        num_poses = len(trace.angle)
 
-        # Construct Progressive Frames
-        # Structure: {'data': frame_data, 'title': str, 'visible_rules': list, 'annotation': str}
-        animation_frames = []
+        # Construct Progressive Phases
+        # Each phase is (frame count, pose cycle length, info); info holds
+        # {'title': str, 'rule_mask': int, 'annotation': str, 'iteration': int}.
+        # Animation frame i is resolved on demand from the phase it falls in.
+        phases = []
         
         # 1. Base Mechanism Phase
         iteration_idx = 0
-        for f in sim_frames[:len(sim_frames)//2]: # Show half cycle
-            animation_frames.append({
-                'data': f, 
-                'title': f"Base: {base_mechanism_name}", 
-                'visible_rules': [],
-                'annotation': "Base Mechanism (Satisfies EF1: Motion)",
-                'iteration': iteration_idx
-            })
+        phases.append((num_poses//2, num_poses//2, { # Show half cycle
+            'title': f"Base: {base_mechanism_name}", 
+            'rule_mask': 0,
+            'annotation': "Base Mechanism (Satisfies EF1: Motion)",
+            'iteration': iteration_idx
+        }))
             
         # 2. Rule Application Phase
         applied_rules = []
@@ -73,27 +188,49 @@ class Visualizer:
                 elif "R4.1" in rule: note = "Adding Spring (Satisfies EF3: Return)"
                 elif "R2.1" in rule: note = "Adding Var. Joint (Satisfies EF4: Slamming)"
                 
-                # Transition frames (pause to show rule application)
-                last_data = sim_frames[0] # Use a neutral pose
-                for _ in range(pause_frames_per_rule):
-                    animation_frames.append({
-                        'data': last_data,
-                        'title': f"Applying {rule}...",
-                        'visible_rules': applied_rules + [rule],
-                        'annotation': note
-                        ,'iteration': ri
-                    })
+                # Transition frames (pause on the neutral pose to show rule application)
+                phases.append((pause_frames_per_rule, 1, {
+                    'title': f"Applying {rule}...",
+                    'rule_mask': _rule_mask(applied_rules + [rule]),
+                    'annotation': note
+                    ,'iteration': ri
+                }))
                 applied_rules.append(rule)
                 
         # 3. Final Mechanism Phase
-        for f in sim_frames * final_cycles: # Show full cycle for configured cycles
-            animation_frames.append({
-                'data': f,
-                'title': f"Final Mechanism (Satisfies Task)",
-                'visible_rules': applied_rules,
-                'annotation': "Full Functionality Verified",
-                'iteration': len(solution_node.path) if solution_node and hasattr(solution_node, 'path') else iteration_idx
-            })
+        phases.append((num_poses * final_cycles, num_poses, { # Show full cycle for configured cycles
+            'title': f"Final Mechanism (Satisfies Task)",
+            'rule_mask': _rule_mask(applied_rules),
+            'annotation': "Full Functionality Verified",
+            'iteration': len(solution_node.path) if solution_node and hasattr(solution_node, 'path') else iteration_idx
+        }))
+        
+        phases = [phase for phase in phases if phase[0] > 0]
+        phase_starts = np.cumsum([0] + [phase[0] for phase in phases[:-1]])
+        total_frames = sum(phase[0] for phase in phases)
+        
+        # Pose, phase and force-arrow anchor last drawn, so repeated state skips the artist setters
+        shown = SimpleNamespace(pose=None, phase=None, arrow_anchor=None)
+        
+        def frame_at(i):
+            """Simulated pose index and phase info for animation frame i."""
+            k = int(np.searchsorted(phase_starts, i, side='right')) - 1
+            _, cycle, info = phases[k]
+            return int(i - phase_starts[k]) % cycle, info
+
+        def frame_key(i):
+            """Everything the pixels of animation frame i depend on: its pose and the phase overlays."""
+            t, info = frame_at(i)
+            return t, info['title'], info['annotation'], info['iteration'], info['rule_mask']
+
+        def held_frames():
+            """(animation frame, frames it is held for): a rule pause is one still held for the whole pause."""
+            for (count, cycle, _), start in zip(phases, phase_starts):
+                if cycle == 1:
+                    yield int(start), count
+                else:
+                    for i in range(int(start), int(start) + count):
+                        yield i, 1
 
         update_func = None
         
@@ -115,6 +252,10 @@ class Visualizer:
             ax.add_patch(arrow_input)
             arrow_output = FancyArrowPatch((0,0), (0,0), arrowstyle="simple", color="blue", alpha=0.0)
             ax.add_patch(arrow_output)
+            # Input Torque on Crank does not move, so it is placed once here
+            arrow_input.set_positions((0.5, -0.5), (0.5, 0.5)) # Simplified
+            arrow_input.set_alpha(0.6)
+            arrow_output.set_alpha(0.6)
             
             # Rule elements (Hidden initially)
             stopper = patches.Rectangle((6.0, -0.2), 0.2, 1.0, fc='red', alpha=0.0) # R3.1
@@ -125,47 +266,58 @@ class Visualizer:
             txt_annotation = ax.text(3, 2.5, "", ha='center', fontsize=10, bbox=dict(facecolor='white', alpha=0.8))
             iteration_text = ax.text(-1.5, 2.5, "", ha='left', fontsize=10, bbox=dict(facecolor='white', alpha=0.8))
             
-            def update_slider_crank(frame_wrapper):
-                frame = frame_wrapper['data']
-                rules = frame_wrapper['visible_rules']
-                ax.set_title(frame_wrapper['title'])
-                txt_annotation.set_text(frame_wrapper['annotation'])
-                iteration_text.set_text(f"Iteration: {frame_wrapper.get('iteration', 0)}")
+            # Per-pose geometry as (pose, point, xy) arrays, indexed by pose in the update
+            crank_tip = np.column_stack([trace.Ax, trace.Ay]).astype(float)
+            slider_xy = np.column_stack([trace.Bx, trace.By]).astype(float)
+            crank_xy = np.stack([np.zeros_like(crank_tip), crank_tip], axis=1)
+            coupler_xy = np.stack([crank_tip, slider_xy], axis=1)
+            
+            # Spring polyline per simulated pose (its wiggle phase follows the absolute position,
+            # so it is not a shifted template), built for all poses at once
+            spring_x = np.linspace(slider_xy[:, 0] + 0.5, 7.0, 20, axis=-1)
+            spring_y = -0.2 + 0.1 * np.sin(10 * spring_x) # Wiggle
+            
+            # Everything the update redraws; only these are re-rasterized when blitting
+            animated_artists = (title_text, line_crank, line_coupler, rect_slider, stopper, spring, arrow_input, arrow_output, txt_annotation, iteration_text)
+            for artist in animated_artists:
+                artist.set_animated(True)
+            
+            def update_slider_crank(i):
+                t, phase = frame_at(i)
+                if t == shown.pose and phase is shown.phase: # e.g. rule pause frames
+                    return animated_artists
+                rule_mask = phase['rule_mask']
+                if phase is not shown.phase:
+                    title_text.set_text(phase['title'])
+                    txt_annotation.set_text(phase['annotation'])
+                    iteration_text.set_text(f"Iteration: {phase['iteration']}")
+                    stopper.set_alpha(1.0 if rule_mask & RULE_STOPPER else 0.0)
                 
                 # Update Motion
-                c_pts = frame['crank']
-                line_crank.set_data([p[0] for p in c_pts], [p[1] for p in c_pts])
-                cp_pts = frame['coupler']
-                line_coupler.set_data([p[0] for p in cp_pts], [p[1] for p in cp_pts])
-                s_pos = frame['slider']
+                c_pts = crank_xy[t]
+                line_crank.set_data(c_pts[:, 0], c_pts[:, 1])
+                cp_pts = coupler_xy[t]
+                line_coupler.set_data(cp_pts[:, 0], cp_pts[:, 1])
+                s_pos = slider_xy[t]
                 rect_slider.set_xy((s_pos[0] - 0.5, s_pos[1] - 0.25))
                 
                 # Update Forces
-                # Input Torque on Crank
-                arrow_input.set_positions((0.5, -0.5), (0.5, 0.5)) # Simplified
-                arrow_input.set_alpha(0.6)
-                
-                # Output Force on Slider
-                arrow_output.set_positions((s_pos[0], s_pos[1]), (s_pos[0]-1.0, s_pos[1]))
-                arrow_output.set_alpha(0.6)
+                # Output Force on Slider (only repositioned when the slider moved)
+                anchor = (s_pos[0], s_pos[1])
+                if anchor != shown.arrow_anchor:
+                    arrow_output.set_positions(anchor, (s_pos[0]-1.0, s_pos[1]))
+                    shown.arrow_anchor = anchor
                 
                 # Update Rules Visibility
-                if any('R3.1' in r for r in rules): # Stopper
-                    stopper.set_alpha(1.0)
-                else:
-                    stopper.set_alpha(0.0)
-                    
-                if any('R4.1' in r for r in rules): # Spring
+                if rule_mask & RULE_SPRING: # Spring
                     spring.set_alpha(1.0)
                     # Draw spring from slider to wall
-                    sx = s_pos[0] + 0.5
-                    spring_x = np.linspace(sx, 7.0, 20)
-                    spring_y = -0.2 + 0.1 * np.sin(10 * spring_x) # Wiggle
-                    spring.set_data(spring_x, spring_y)
+                    spring.set_data(spring_x[t], spring_y[t])
                 else:
                     spring.set_alpha(0.0)
                 
-                return line_crank, line_coupler, rect_slider, stopper, spring, arrow_input, arrow_output, txt_annotation, iteration_text
+                shown.pose, shown.phase = t, phase
+                return animated_artists
                 
             update_func = update_slider_crank
 
@@ -185,6 +337,11 @@ class Visualizer:
             ax.add_patch(arrow_input)
             arrow_output = FancyArrowPatch((0,0), (0,0), arrowstyle="simple", color="blue", alpha=0.0)
             ax.add_patch(arrow_output)
+            # The pinion center is fixed, so its input arrow is placed once here
+            pc = trace.pinion_center
+            arrow_input.set_positions((pc[0]-0.5, pc[1]-0.5), (pc[0]+0.5, pc[1]+0.5))
+            arrow_input.set_alpha(0.6)
+            arrow_output.set_alpha(0.6)
             
             # Rule elements
             stopper = patches.Rectangle((5.5, -0.2), 0.2, 1.0, fc='red', alpha=0.0) # R3.1
@@ -195,45 +352,52 @@ class Visualizer:
             txt_annotation = ax.text(3, 3.5, "", ha='center', fontsize=10, bbox=dict(facecolor='white', alpha=0.8))
             iteration_text = ax.text(-1.5, 3.5, "", ha='left', fontsize=10, bbox=dict(facecolor='white', alpha=0.8))
             
-            def update_rack_pinion(frame_wrapper):
-                frame = frame_wrapper['data']
-                rules = frame_wrapper['visible_rules']
-                ax.set_title(frame_wrapper['title'])
-                txt_annotation.set_text(frame_wrapper['annotation'])
-                iteration_text.set_text(f"Iteration: {frame_wrapper.get('iteration', 0)}")
+            # Per-pose geometry, indexed by pose in the update
+            marker_xy = np.column_stack([trace.marker_x, trace.marker_y]).astype(float)
+            rack_x = trace.rack_x.astype(float)
+            
+            # Spring polyline per simulated pose, from the rack end to the wall
+            spring_x = np.linspace(rack_x + 6, 7.0, 20, axis=-1)
+            spring_y = -0.2 + 0.1 * np.sin(10 * spring_x)
+            
+            # Everything the update redraws; only these are re-rasterized when blitting
+            animated_artists = (title_text, pinion_circle, pinion_marker, rack_rect, stopper, spring, arrow_input, arrow_output, txt_annotation, iteration_text)
+            for artist in animated_artists:
+                artist.set_animated(True)
+            
+            def update_rack_pinion(i):
+                t, phase = frame_at(i)
+                if t == shown.pose and phase is shown.phase: # e.g. rule pause frames
+                    return animated_artists
+                rule_mask = phase['rule_mask']
+                if phase is not shown.phase:
+                    title_text.set_text(phase['title'])
+                    txt_annotation.set_text(phase['annotation'])
+                    iteration_text.set_text(f"Iteration: {phase['iteration']}")
+                    stopper.set_alpha(1.0 if rule_mask & RULE_STOPPER else 0.0)
                 
                 # Update Motion
-                pc = frame['pinion_center']
                 pinion_circle.center = pc
-                pm = frame['pinion_marker']
-                pinion_marker.set_data([pm[0]], [pm[1]])
-                rx = frame['rack_x']
+                pm = marker_xy[t]
+                pinion_marker.set_data(pm[:1], pm[1:])
+                rx = rack_x[t]
                 rack_rect.set_xy((rx, -0.4)) # Adjusted to be tangent
                 
-                # Update Forces
-                arrow_input.set_positions((pc[0]-0.5, pc[1]-0.5), (pc[0]+0.5, pc[1]+0.5))
-                arrow_input.set_alpha(0.6)
-                
-                arrow_output.set_positions((rx+3, -0.2), (rx+2, -0.2))
-                arrow_output.set_alpha(0.6)
+                # Update Forces (only repositioned when the rack moved)
+                if rx != shown.arrow_anchor:
+                    arrow_output.set_positions((rx+3, -0.2), (rx+2, -0.2))
+                    shown.arrow_anchor = rx
                 
                 # Update Rules
-                if any('R3.1' in r for r in rules): # Stopper
-                    stopper.set_alpha(1.0)
-                else:
-                    stopper.set_alpha(0.0)
-                    
-                if any('R4.1' in r for r in rules): # Spring
+                if rule_mask & RULE_SPRING: # Spring
                     spring.set_alpha(1.0)
                     # Draw spring from rack end to wall
-                    rack_end = rx + 6
-                    spring_x = np.linspace(rack_end, 7.0, 20)
-                    spring_y = -0.2 + 0.1 * np.sin(10 * spring_x)
-                    spring.set_data(spring_x, spring_y)
+                    spring.set_data(spring_x[t], spring_y[t])
                 else:
                     spring.set_alpha(0.0)
                 
-                return pinion_circle, pinion_marker, rack_rect, stopper, spring, arrow_input, arrow_output, txt_annotation, iteration_text
+                shown.pose, shown.phase = t, phase
+                return animated_artists
             
             update_func = update_rack_pinion
 
@@ -251,6 +415,7 @@ class Visualizer:
             # Forces
             arrow_input = FancyArrowPatch((0,0), (0,0), connectionstyle="arc3,rad=.5", arrowstyle="Simple,tail_width=0.5,head_width=4,head_length=8", color="orange", alpha=0.0)
             ax.add_patch(arrow_input)
+            arrow_input.set_alpha(0.6)
             
             # Rule elements
             stopper = patches.Rectangle((-0.5, 2.5), 1.0, 0.1, fc='red', alpha=0.0) # R3.1
@@ -261,72 +426,99 @@ class Visualizer:
             txt_annotation = ax.text(0, 2.8, "", ha='center', fontsize=10, bbox=dict(facecolor='white', alpha=0.8))
             iteration_text = ax.text(-2.5, 2.8, "", ha='left', fontsize=10, bbox=dict(facecolor='white', alpha=0.8))
             
-            def update_cam_follower(frame_wrapper):
-                frame = frame_wrapper['data']
-                rules = frame_wrapper['visible_rules']
-                ax.set_title(frame_wrapper['title'])
-                txt_annotation.set_text(frame_wrapper['annotation'])
-                iteration_text.set_text(f"Iteration: {frame_wrapper.get('iteration', 0)}")
+            # Per-pose geometry, indexed by pose in the update
+            cam_xy = np.column_stack([trace.cam_cx, trace.cam_cy]).astype(float)
+            follower_y = trace.follower_y.astype(float)
+            
+            # Spring polyline per simulated pose, coiled around the follower stem
+            spring_y = np.linspace(follower_y, follower_y + 2, 20, axis=-1)
+            spring_x = 0.2 * np.sin(20 * spring_y)
+            
+            # Everything the update redraws; only these are re-rasterized when blitting
+            animated_artists = (title_text, cam_circle, follower_stem, follower_head, stopper, spring, arrow_input, txt_annotation, iteration_text)
+            for artist in animated_artists:
+                artist.set_animated(True)
+            
+            def update_cam_follower(i):
+                t, phase = frame_at(i)
+                if t == shown.pose and phase is shown.phase: # e.g. rule pause frames
+                    return animated_artists
+                rule_mask = phase['rule_mask']
+                if phase is not shown.phase:
+                    title_text.set_text(phase['title'])
+                    txt_annotation.set_text(phase['annotation'])
+                    iteration_text.set_text(f"Iteration: {phase['iteration']}")
+                    stopper.set_alpha(1.0 if rule_mask & RULE_STOPPER else 0.0)
                 
                 # Update Motion
-                cc = frame['cam_center']
+                cc = cam_xy[t]
                 cam_circle.center = cc
-                fy = frame['follower_y']
+                fy = follower_y[t]
                 follower_stem.set_data([0, 0], [fy, fy + 2])
                 follower_head.set_xy((-0.2, fy))
                 
-                # Update Forces
-                arrow_input.set_positions((cc[0]-0.5, cc[1]-0.5), (cc[0]+0.5, cc[1]+0.5))
-                arrow_input.set_alpha(0.6)
+                # Update Forces (only repositioned when the cam center moved)
+                anchor = (cc[0], cc[1])
+                if anchor != shown.arrow_anchor:
+                    arrow_input.set_positions((cc[0]-0.5, cc[1]-0.5), (cc[0]+0.5, cc[1]+0.5))
+                    shown.arrow_anchor = anchor
                 
                 # Update Rules
-                if any('R3.1' in r for r in rules): # Stopper
-                    stopper.set_alpha(1.0)
-                else:
-                    stopper.set_alpha(0.0)
-                    
-                if any('R4.1' in r for r in rules): # Spring
+                if rule_mask & RULE_SPRING: # Spring
                     spring.set_alpha(1.0)
                     # Draw spring around stem
-                    sy = np.linspace(fy, fy+2, 20)
-                    sx = 0.2 * np.sin(20 * sy)
-                    spring.set_data(sx, sy)
+                    spring.set_data(spring_x[t], spring_y[t])
                 else:
                     spring.set_alpha(0.0)
                 
-                return cam_circle, follower_stem, follower_head, stopper, spring, arrow_input, txt_annotation, iteration_text
+                shown.pose, shown.phase = t, phase
+                return animated_artists
                 
             update_func = update_cam_follower
 
-        # Create Animation
-        ani = FuncAnimation(fig, update_func, frames=animation_frames, blit=False, interval=int(1000/fps))
-        
         # Save
         filepath = os.path.join('output', filename)
         try:
-            # Try to save both GIF and MP4 (if ffmpeg present)
-            try:
-                ani.save(filepath, writer=PillowWriter(fps=fps))
-                print(f" -> GIF saved to '{filepath}'")
-            except Exception as e:
-                print(f" -> Failed to save GIF: {e}")
-            # Try MP4
-            try:
-                from matplotlib.animation import FFMpegWriter
-                mp4_path = os.path.splitext(filepath)[0] + '.mp4'
-                writer = FFMpegWriter(fps=fps)
-                ani.save(mp4_path, writer=writer)
-                print(f" -> MP4 saved to '{mp4_path}'")
-            except Exception:
-                pass
+            # Render the frames once: to MP4 when it is requested and ffmpeg is present
+            # (a GIF is then transcoded from it with a generated palette), otherwise
+            # straight to GIF
+            mp4_saved = gif_saved = False
+            first_frame = None
+            if 'mp4' in formats and self._ffmpeg_available():
+                try:
+                    # Imported here: only the MP4 path drives a FuncAnimation
+                    from matplotlib.animation import FuncAnimation, FFMpegWriter
+                    mp4_path = os.path.splitext(filepath)[0] + '.mp4'
+                    ani = FuncAnimation(fig, update_func, frames=range(total_frames), blit=True, interval=int(1000/fps))
+                    ani.save(mp4_path, writer=FFMpegWriter(fps=fps))
+                    print(f" -> MP4 saved to '{mp4_path}'")
+                    mp4_saved = True
+                except Exception as e:
+                    print(f" -> Failed to save MP4: {e}")
+            if 'gif' in formats and mp4_saved:
+                try:
+                    self._transcode_to_gif(mp4_path, filepath, fps)
+                    print(f" -> GIF saved to '{filepath}'")
+                    gif_saved = True
+                except Exception as e:
+                    print(f" -> Failed to transcode MP4 to GIF: {e}")
+            if 'gif' in formats and not gif_saved:
+                try:
+                    first_frame = self._save_gif(fig, update_func, held_frames(), frame_key, filepath, fps)
+                    print(f" -> GIF saved to '{filepath}'")
+                except Exception as e:
+                    print(f" -> Failed to save GIF: {e}")
             
-            # Save a static preview frame as PNG for pause/toggle actions
+            # Save a static preview frame as PNG for pause/toggle actions; it is the
+            # GIF's first frame, reused as rasterized when the GIF was written here
             try:
                 preview_path = os.path.splitext(filepath)[0] + '_preview.png'
-                # Draw first frame to export
-                first_frame = animation_frames[0]
-                update_func(first_frame)
-                plt.savefig(preview_path, dpi=200, bbox_inches='tight')
+                if first_frame is not None:
+                    first_frame.save(preview_path, optimize=True)
+                else:
+                    # Draw first frame to export
+                    update_func(0)
+                    fig.savefig(preview_path)
                 print(f" -> Preview saved to '{preview_path}'")
             except Exception as e:
                 print(f" -> Failed to save preview image: {e}")
@@ -341,8 +533,41 @@ class Visualizer:
             print(f" -> Animation saved to '{filepath}'")
         except Exception as e:
             print(f" -> Failed to save animation: {e}")
-        
-        plt.close(fig)
+
+    def _save_gif(self, fig, update_func, held_frames, frame_key, gif_path: str, fps: int) -> Image.Image:
+        """
+        Render each (animation frame, hold count) through a reused RGBA buffer and write an
+        optimized GIF, showing each frame for hold count frame intervals. Frames with an
+        equal frame_key (e.g. repeated final cycles) are rasterized once and reused.
+        Returns the first frame's image.
+        """
+        width, height = (int(round(v)) for v in fig.get_size_inches() * fig.dpi)
+        frame_ms = int(1000 / fps)
+        buf = io.BytesIO()
+        rendered = {}
+        frames = []
+        durations = []
+        for i, hold in held_frames:
+            key = frame_key(i)
+            image = rendered.get(key)
+            if image is None:
+                update_func(i)
+                buf.seek(0)
+                buf.truncate()
+                fig.savefig(buf, format='rgba', dpi=fig.dpi)
+                image = rendered[key] = Image.frombytes('RGBA', (width, height), buf.getvalue()).convert('RGB')
+            frames.append(image)
+            durations.append(hold * frame_ms)
+        frames[0].save(gif_path, save_all=True, append_images=frames[1:], duration=durations, optimize=True, loop=0)
+        return frames[0]
+
+    def _transcode_to_gif(self, mp4_path: str, gif_path: str, fps: int) -> None:
+        """Convert an MP4 to a GIF with ffmpeg, using a palette generated from the video."""
+        ffmpeg = mpl.rcParams['animation.ffmpeg_path']
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            palette_path = os.path.join(tmp_dir, 'palette.png')
+            subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', mp4_path, '-vf', f'fps={fps},palettegen', palette_path], check=True)
+            subprocess.run([ffmpeg, '-y', '-loglevel', 'error', '-i', mp4_path, '-i', palette_path, '-lavfi', f'fps={fps}[x];[x][1:v]paletteuse', gif_path], check=True)
 
     def _generate_html_player(self, gif_path: str, preview_path: str, html_path: str) -> None:
         """Generates a simple HTML wrapper for the GIF with play/pause and step text controls.
@@ -420,7 +645,7 @@ class Visualizer:
         Main dispatch method. Calls the correct drawing function based on the mechanism name.
         Also generates a NetworkX graph visualization of the mechanism topology.
         """
-        fig, ax = plt.subplots(figsize=(8, 6))
+        fig, ax = self._figure((8, 6))
         ax.set_aspect('equal')
         ax.set_xlim(-2, 8)
         ax.set_ylim(-2, 4)
@@ -452,11 +677,13 @@ class Visualizer:
         else:
             self._draw_generic_graph(ax, getattr(solution_node, 'graph', None))
 
-        self._annotate_modifications(ax, getattr(solution_node, 'path', []))
+        modification_lines = self._annotate_modifications(ax, getattr(solution_node, 'path', []))
 
         filepath = os.path.join('output', filename)
-        plt.savefig(filepath, dpi=200, bbox_inches='tight')
-        plt.close(fig)
+        # Laid out once, then rendered in a single pass (bbox_inches='tight' would render twice)
+        fig.tight_layout()
+        self._set_line_step(modification_lines, ax, _MODIFICATION_LINE_STEP)
+        fig.savefig(filepath, dpi=SCHEMATIC_DPI, pil_kwargs={'optimize': True})
         
         # Also generate NetworkX graph visualization
         if hasattr(solution_node, 'graph') and solution_node.graph is not None:
@@ -582,22 +809,13 @@ class Visualizer:
         import networkx as nx
         
         G = nx.from_numpy_array(graph.adj_matrix)
-        pos = nx.spring_layout(G, seed=42)  # Consistent layout
+        # Consistent (seeded) layout, cached per topology and shared with MechanismGraph.draw
+        pos = _layout_for(graph.adj_matrix.tobytes(), graph.num_elements, graph.adj_matrix.dtype.str)
         
-        # Create edge labels from joint types
-        edge_labels = {}
-        for u, v, data in G.edges(data=True):
-            joint_code = data['weight']
-            # Find the joint type from the code
-            joint_type = None
-            for key, value in graph.JOINT_MAP.items():
-                if value == joint_code:
-                    joint_type = key
-                    break
-            if joint_type:
-                edge_labels[(u, v)] = joint_type
+        # Create edge labels from joint types (decoded through the inverse JOINT_MAP)
+        edge_labels = {(u, v): joint_type for u, v, joint_type in graph.get_joint_info()}
         
-        fig, ax = plt.subplots(figsize=(10, 8))
+        fig, ax = self._figure((10, 8))
         
         # Node colors: highlight Ground (node 0) in different color
         node_colors = ['lightcoral' if i == 0 else 'skyblue' for i in range(graph.num_elements)]
@@ -626,17 +844,16 @@ class Visualizer:
                        transform=ax.transAxes, fontsize=9, verticalalignment='top')
         
         # Add legend for joint types
-        legend_text = "Joint Types:\n"
-        for joint_type, code in graph.JOINT_MAP.items():
-            legend_text += f"  {joint_type} = {self._get_joint_description(joint_type)}\n"
+        legend_text = _joint_legend(type(self), tuple(graph.JOINT_MAP))
         ax.text(0.98, 0.02, legend_text, transform=ax.transAxes, 
                fontsize=8, verticalalignment='bottom', horizontalalignment='right',
                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
         
         filepath = os.path.join('output', filename)
-        plt.savefig(filepath, dpi=200, bbox_inches='tight')
+        # Laid out once, then rendered in a single pass (bbox_inches='tight' would render twice)
+        fig.tight_layout()
+        fig.savefig(filepath, dpi=SCHEMATIC_DPI, pil_kwargs={'optimize': True})
         print(f"  -> NetworkX graph saved to 'output/{filename}'")
-        plt.close(fig)
     
     def _get_rule_description(self, rule_id: str) -> str:
         """Returns a human-readable description for a rule ID."""
@@ -649,41 +866,81 @@ class Visualizer:
         }
         return rule_map.get(rule_id, 'Unknown')
     
-    def _get_joint_description(self, joint_type: str) -> str:
+    @classmethod
+    def _get_joint_description(cls, joint_type: str) -> str:
         """Returns a description for each joint type."""
-        joint_desc = {
-            'R': 'Revolute',
-            'P': 'Prismatic',
-            'X': 'Higher Pair',
-            'F': 'Fixed',
-            'LP': 'Limited Prismatic',
-            'SP': 'Spring-Loaded Prismatic',
-            'LSP': 'Limited Spring Prismatic'
-        }
-        return joint_desc.get(joint_type, 'Unknown')
+        return cls._JOINT_DESC.get(joint_type, 'Unknown')
     
     def _draw_generic_graph(self, ax, graph) -> None:
         ax.text(0.5, 0.5, "Generic Graph Visualization\n(saved silently)",
                 ha='center', va='center', fontsize=12, color='red')
         # Avoid calling graph.visualize() here to prevent blocking pop-ups
 
-    def _annotate_modifications(self, ax, path: List[str]) -> None:
+    def _annotate_modifications(self, ax, path: List[str]) -> Text:
+        """Draw the Modifications block; returns its rule-lines Text (see _set_line_step)."""
+        path = path or []
         y_pos = 3.5
-        ax.text(0, y_pos, "Modifications:", fontsize=10, weight='bold')
-        if not path:
-            ax.text(0, y_pos - 0.4, " - None", fontsize=9)
-            return
-
+        ax.text(0, y_pos, "Modifications:", fontproperties=_MODIFICATION_HEADER_FONT)
+        # All rule lines as one multi-line text, one line per rule below the header. The text
+        # is top-aligned 0.15 below the header, which puts the first baseline roughly one
+        # _MODIFICATION_LINE_STEP (0.4) below it for the 9 pt font; the line spacing itself
+        # is derived from the axes transform once the layout is final (_set_line_step)
+        lines = ax.text(0, y_pos - 0.15, _modification_lines(tuple(path)),
+                        fontproperties=_MODIFICATION_FONT, verticalalignment='top')
+
+        # Every R3.1 stopper goes into one collection (a single artist and draw call), under
+        # one shared label: repeated stoppers used to stack identical labels on the same spot
+        stoppers = path.count("R3.1")
+        if stoppers:
+            ax.add_collection(PolyCollection([_STOPPER_VERTS] * stoppers, facecolors='darkred'))
+            ax.text(6.1, 0.5, "Stopper", fontproperties=_MARK_LABEL_FONT, ha='center', color='darkred')
+
+        renderers = type(self)._RULE_RENDERERS
         for rule_id in path:
-            y_pos -= 0.4
-            if rule_id == "R3.1":
-                ax.text(0, y_pos, " - R3.1: Added Stopper", fontsize=9)
-                stopper = patches.Rectangle((6, -0.15), 0.2, 0.5, facecolor='darkred')
-                ax.add_patch(stopper)
-                ax.text(6.1, 0.5, "Stopper", ha='center', color='darkred')
-            elif rule_id == "R4.1":
-                ax.text(0, y_pos, " - R4.1: Added Return Spring", fontsize=9)
-                ax.plot([0, 1.5], [1.5, 1.5], 'k--', alpha=0.5)
-                ax.text(0.75, 1.6, "Spring", ha='center', color='green')
+            renderer = renderers.get(rule_id)
+            if renderer:
+                renderer(self, ax)
+        return lines
 
+    @staticmethod
+    def _set_line_step(text: Text, ax, step: float) -> None:
+        """
+        Space a multi-line Text's baselines `step` data units apart.
 
+        Matplotlib's linespacing is a multiple of the font's line height, taken here to
+        be its size (true for the default DejaVu Sans; other fonts, or matplotlib versions
+        that measure line height differently, end up slightly off). Call it once the axes
+        layout is final (e.g. after tight_layout).
+        """
+        ax.apply_aspect()  # an equal-aspect axes only shrinks to its final box at draw time
+        (_, y0), (_, y1) = ax.transData.transform([(0, 0), (0, step)])
+        step_points = abs(y1 - y0) * 72 / ax.get_figure().dpi
+        text.set_linespacing(step_points / text.get_fontproperties().get_size_in_points())
+
+    def _render_spring(self, ax) -> None:
+        # Line2D added directly: no format-string parsing or autoscaling as with ax.plot
+        ax.add_line(Line2D([0, 1.5], [1.5, 1.5], color='k', linestyle='--', alpha=0.5))
+        ax.text(0.75, 1.6, "Spring", fontproperties=_MARK_LABEL_FONT, ha='center', color='green')
+
+    # Schematic marks per rule id (rules without an entry draw nothing; R3.1 stoppers
+    # are drawn together above)
+    _RULE_RENDERERS = MappingProxyType({
+        'R4.1': _render_spring,
+    })
+
+
+@functools.lru_cache(maxsize=8)
+def _joint_legend(cls, joint_types: tuple) -> str:
+    """Joint-type legend of the NetworkX graph (the same for every graph of a class)."""
+    return "Joint Types:\n" + "".join(f"  {joint_type} = {cls._get_joint_description(joint_type)}\n"
+                                       for joint_type in joint_types)
+
+
+def _animation_job(job) -> None:
+    """Worker for Visualizer.generate_animations: one animation on a fresh Visualizer."""
+    base_mechanism_name, filename, solution_node, kwargs = job
+    visualizer = Visualizer()
+    try:
+        visualizer.generate_animation(base_mechanism_name, filename, solution_node=solution_node, **kwargs)
+    finally:
+        visualizer.close()